@@ -0,0 +1,308 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from container import CONTAINER_TYPES
+from port import Port
+from port_registry import PortRegistry
+from port_report import write_port_report
+from ship import Ship
+from world_loader import WorldLoader
+
+# Results of `python benchmark.py --output benchmark_baseline.json` at the default scale, kept in the repository
+BASELINE_FILE = "benchmark_baseline.json"
+
+# Sizes of the synthetic worlds: (ports, ships, containers)
+SCALES = {
+    "tiny": (1, 1, 10),
+    "small": (100, 100, 10000),
+    "medium": (1000, 1000, 100000),
+    "large": (10000, 10000, 1000000),
+    "huge": (100000, 100000, 10000000),
+}
+
+
+def generate_world(n_ports, n_ships, n_containers, seed=0):
+    """
+    Generates a random world of ports, ships and containers.
+
+    Ports are placed at random coordinates between 80°S and 80°N, ships are docked at random ports
+    and containers of random types are stored at random ports.
+
+    Args:
+        n_ports (int): The number of ports.
+        n_ships (int): The number of ships.
+        n_containers (int): The number of containers.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        tuple: Dicts of the ports and ships keyed by ID and the list of containers.
+    """
+    rng = random.Random(seed)
+    ports = {}
+    registry = PortRegistry()
+    for port_id in range(1, n_ports + 1):
+        port = Port(port_id, rng.uniform(-80, 80), rng.uniform(-180, 180))
+        ports[port_id] = port
+        registry.add(port)
+    port_list = list(ports.values())
+    ships = {}
+    for ship_id in range(1, n_ships + 1):
+        port = rng.choice(port_list)
+        ships[ship_id] = Ship(ship_id, rng.uniform(1e5, 1e6), port, 1e9, 100000, rng.uniform(0.1, 2.0))
+        port.incoming_ship(ships[ship_id])
+    container_types = list(CONTAINER_TYPES.values())
+    containers = []
+    for container_id in range(1, n_containers + 1):
+        container = rng.choice(container_types)(container_id, round(rng.uniform(1, 40), 2))
+        containers.append(container)
+        rng.choice(port_list).add_container(container)
+    return ports, ships, containers
+
+
+def write_world_json(path, n_ports, n_ships, n_containers, seed=0):
+    """
+    Writes a random world in the input.json layout, one record at a time.
+
+    Args:
+        path (str): The path of the file to write.
+        n_ports (int): The number of ports.
+        n_ships (int): The number of ships.
+        n_containers (int): The number of containers.
+        seed (int): The seed of the random generator.
+    """
+    rng = random.Random(seed)
+    types = list(CONTAINER_TYPES)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"ports": [')
+        for port_id in range(1, n_ports + 1):
+            f.write(("," if port_id > 1 else "") + json.dumps(
+                {"id": port_id, "latitude": rng.uniform(-80, 80), "longitude": rng.uniform(-180, 180)}))
+        f.write('], "ships": [')
+        for ship_id in range(1, n_ships + 1):
+            f.write(("," if ship_id > 1 else "") + json.dumps(
+                {"id": ship_id, "fuel": 1e5, "current_port": rng.randint(1, n_ports), "max_weight": 1e9,
+                 "max_containers": 100000, "fuel_consumption_per_km": 1.0}))
+        f.write('], "containers": [')
+        for container_id in range(1, n_containers + 1):
+            f.write(("," if container_id > 1 else "") + json.dumps(
+                {"id": container_id, "weight": round(rng.uniform(1, 40), 2), "type": rng.choice(types)}))
+        f.write(']}')
+
+
+# Each case takes the world and returns a function that runs the timed operation
+# and returns the number of operations it performed.
+
+def _case_get_distance(world, rng):
+    ports = list(world[0].values())
+    pairs = [(rng.choice(ports), rng.choice(ports)) for _ in range(100000)]
+
+    def run():
+        for port, other_port in pairs:
+            port.get_distance(other_port)
+        return len(pairs)
+    return run
+
+
+def _case_sail_to(world, rng):
+    ports = list(world[0].values())
+    ships = list(world[1].values())
+    moves = [(rng.choice(ships), rng.choice(ports)) for _ in range(min(100000, 10 * len(ships)))]
+
+    def run():
+        for ship, port in moves:
+            ship.refuel(1e9)
+            ship.sail_to(port)
+        return len(moves)
+    return run
+
+
+def _case_incoming_ship(world, rng):
+    hub = Port(0, 0.0, 0.0)
+    ships = list(world[1].values())
+
+    def run():
+        for ship in ships:
+            hub.incoming_ship(ship)
+        for ship in ships:
+            hub.outgoing_ship(ship)
+        return 2 * len(ships)
+    return run
+
+
+def _case_unload_container(world, rng):
+    ship = next(iter(world[1].values()))
+    containers = world[2][:20000]
+
+    def run():
+        for container in containers:
+            ship.load_container(container)
+        for container in containers:
+            ship.unload_container(container)
+        return 2 * len(containers)
+    return run
+
+
+def _case_report(world, rng):
+    def run():
+        write_port_report(world[0], io.StringIO())
+        return len(world[0])
+    return run
+
+
+CASES = {
+    "get_distance": _case_get_distance,
+    "sail_to": _case_sail_to,
+    "incoming_ship": _case_incoming_ship,
+    "unload_container": _case_unload_container,
+    "report": _case_report,
+}
+
+
+def _measure(run, repeat, memory):
+    best = None
+    operations = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operations = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = {"seconds": best, "operations": operations,
+              "operations_per_second": operations / best if best > 0 else None}
+    if memory:
+        # A separate traced run, so tracing does not distort the timings
+        tracemalloc.start()
+        run()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(scale="small", cases=None, repeat=3, memory=True, seed=0) -> dict:
+    """
+    Times the hot paths of the model on a synthetic world.
+
+    Args:
+        scale (str): One of SCALES.
+        cases (iterable): The names of the cases to run, including "load"; None runs all of them.
+        repeat (int): The number of timed runs per case; the fastest one is kept.
+        memory (bool): Whether to record the peak traced memory of each case.
+        seed (int): The seed of the world generator.
+
+    Returns:
+        dict: The environment and the results per case.
+    """
+    n_ports, n_ships, n_containers = SCALES[scale]
+    selected = list(CASES) + ["load"] if cases is None else list(cases)
+    results = {}
+    if "load" in selected:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "world.json")
+            write_world_json(path, n_ports, n_ships, n_containers, seed)
+
+            def run_load():
+                loader = WorldLoader(path)
+                count = sum(1 for _ in loader.iter_containers())
+                return count + len(loader.ports) + len(loader.ships)
+            results["load"] = _measure(run_load, repeat, memory)
+    world = generate_world(n_ports, n_ships, n_containers, seed)
+    for name in selected:
+        if name != "load":
+            results[name] = _measure(CASES[name](world, random.Random(seed)), repeat, memory)
+    return {
+        "meta": {
+            "scale": scale,
+            "ports": n_ports,
+            "ships": n_ships,
+            "containers": n_containers,
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "results": results
+    }
+
+
+def compare(results, baseline, threshold=0.2) -> list:
+    """
+    Compares benchmark results with a stored baseline.
+
+    Args:
+        results (dict): The output of run_benchmarks().
+        baseline (dict): An earlier output of run_benchmarks() for the same scale.
+        threshold (float): The allowed slowdown, e.g. 0.2 for 20 %.
+
+    Returns:
+        list: Dicts describing each case that got slower than allowed.
+
+    Raises:
+        ValueError: If the baseline was measured on a world of another size.
+    """
+    meta, base_meta = results["meta"], baseline.get("meta", {})
+    for key in ("scale", "ports", "ships", "containers"):
+        if base_meta.get(key) != meta[key]:
+            raise ValueError(f"The baseline was measured with {key} {base_meta.get(key)!r}, "
+                             f"not {meta[key]!r}; compare runs of the same scale")
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append({"case": name, "seconds": result["seconds"],
+                                "baseline_seconds": base["seconds"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks from the command line.
+
+    Args:
+        argv (list): The command-line arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: 1 if a regression against the baseline was found, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks of the shipping model hot paths.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--case", action="append", choices=list(CASES) + ["load"],
+                        help="run only this case (may be repeated)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help=f"compare with the results stored in this file, e.g. {BASELINE_FILE}"
+                                           " for the default scale")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, default 0.2 (20%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scale, args.case, args.repeat, not args.no_memory, args.seed)
+    for name, result in results["results"].items():
+        peak = result.get("peak_bytes")
+        print(f"{name:18} {result['seconds'] * 1000:10.2f} ms"
+              + (f" {peak / 1e6:10.2f} MB peak" if peak is not None else ""))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(results, baseline, args.threshold)
+        except ValueError as error:
+            parser.error(str(error))
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']}: {regression['ratio']:.2f}x slower than baseline")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
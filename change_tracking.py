@@ -0,0 +1,62 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from port import Port
+
+
+class ChangeTracker:
+    """
+    Collects the ports that changed since it was last drained.
+
+    A watched port reports itself to every tracker in its ``trackers`` list from
+    Port.mark_changed(), which Port and Ship call on every container, ship, fuel
+    or coordinate change. Draining the tracker therefore costs time proportional
+    to the number of changed ports, not to the size of the world.
+    """
+
+    def __init__(self):
+        self._dirty = {}  # id(port) -> port, in the order the ports first changed
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def watch(self, port: 'Port'):
+        """
+        Starts receiving the changes of a port.
+
+        Args:
+            port (Port): The port to watch.
+        """
+        if self not in port.trackers:
+            port.trackers.append(self)
+
+    def unwatch(self, port: 'Port'):
+        """
+        Stops receiving the changes of a port.
+
+        Args:
+            port (Port): The port to stop watching.
+        """
+        if self in port.trackers:
+            port.trackers.remove(self)
+        self._dirty.pop(id(port), None)
+
+    def mark(self, port: 'Port'):
+        """
+        Records that a port changed.
+
+        Args:
+            port (Port): The port that changed.
+        """
+        self._dirty[id(port)] = port
+
+    def drain(self) -> list:
+        """
+        Returns the ports that changed since the last call and forgets them.
+
+        Returns:
+            list: The changed ports.
+        """
+        ports = list(self._dirty.values())
+        self._dirty.clear()
+        return ports
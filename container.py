@@ -7,6 +7,8 @@ class Container:
         weight (float): The weight of the container in tons.
     """
 
+    __slots__ = ('container_id', 'weight')  # No per-instance __dict__
+
     def __init__(self, container_id, weight):
         """
         Initializes the container with a given ID and weight.
@@ -39,6 +41,15 @@ class Container:
         """
         return (self.container_id == other.container_id) and (self.weight == other.weight)
 
+    def __hash__(self):
+        """
+        Hashes the container consistently with __eq__.
+
+        Returns:
+            int: A hash of the container ID and weight.
+        """
+        return hash((self.container_id, self.weight))
+
 
 class BasicContainer(Container):
     """
@@ -47,6 +58,8 @@ class BasicContainer(Container):
     This container type has the same fuel consumption formula as the base class.
     """
 
+    __slots__ = ()
+
     def consumption(self):
         """
         Calculates the fuel consumption for the basic container.
@@ -64,6 +77,8 @@ class HeavyContainer(Container):
     This container type has a higher fuel consumption than the basic container.
     """
 
+    __slots__ = ()
+
     def consumption(self):
         """
         Calculates the fuel consumption for the heavy container.
@@ -81,6 +96,8 @@ class RefrigeratedContainer(HeavyContainer):
     This container type has an even higher fuel consumption due to refrigeration needs.
     """
 
+    __slots__ = ()
+
     def consumption(self):
         """
         Calculates the fuel consumption for the refrigerated container.
@@ -98,6 +115,8 @@ class LiquidContainer(HeavyContainer):
     This container type has a different consumption rate compared to heavy and refrigerated containers.
     """
 
+    __slots__ = ()
+
     def consumption(self):
         """
         Calculates the fuel consumption for the liquid container.
@@ -106,3 +125,69 @@ class LiquidContainer(HeavyContainer):
             float: The fuel consumption for the liquid container, which is higher due to its contents.
         """
         return self.weight * 4.0  # Higher consumption for transporting liquids
+
+
+CONTAINER_TYPES = {
+    "basic": BasicContainer,
+    "heavy": HeavyContainer,
+    "refrigerated": RefrigeratedContainer,
+    "liquid": LiquidContainer
+}
+
+_TYPE_NAME_BY_CLASS = {container_class: type_name for type_name, container_class in CONTAINER_TYPES.items()}
+
+# Compact numeric codes of the container types, used by columnar storage
+CONTAINER_TYPE_CODES = {type_name: code for code, type_name in enumerate(CONTAINER_TYPES)}
+
+# Fuel consumption per ton of each container type, matching their consumption() methods
+FUEL_RATES = {
+    "basic": 2.5,
+    "heavy": 3.0,
+    "refrigerated": 5.0,
+    "liquid": 4.0
+}
+
+
+def container_type_name(container: Container):
+    """
+    Returns the name under which the type of a container is registered.
+
+    Subclasses of the registered types (such as ContainerStore views) resolve to
+    the closest registered ancestor; the result is cached per class.
+
+    Args:
+        container (Container): The container to classify.
+
+    Returns:
+        str: One of the keys of CONTAINER_TYPES, or None for a plain Container.
+    """
+    container_class = type(container)
+    try:
+        return _TYPE_NAME_BY_CLASS[container_class]
+    except KeyError:
+        type_name = None
+        for base in container_class.__mro__:
+            if base in CONTAINER_TYPES.values():
+                type_name = _TYPE_NAME_BY_CLASS[base]
+                break
+        _TYPE_NAME_BY_CLASS[container_class] = type_name
+        return type_name
+
+
+def create_container(container_data: dict) -> Container:
+    """
+    Creates a container of the type named in the input data.
+
+    Args:
+        container_data (dict): A container record with "id", "weight" and "type" keys.
+
+    Returns:
+        Container: An instance of the container class registered for the type.
+
+    Raises:
+        ValueError: If the type is not one of CONTAINER_TYPES.
+    """
+    container_class = CONTAINER_TYPES.get(container_data["type"])
+    if container_class is None:
+        raise ValueError(f"Unknown container type: {container_data['type']!r}")
+    return container_class(container_data["id"], container_data["weight"])
@@ -0,0 +1,114 @@
+FIRST_FIT_DECREASING = "first_fit_decreasing"
+VALUE_DENSITY = "value_density"
+EXACT = "exact"
+STRATEGIES = (FIRST_FIT_DECREASING, VALUE_DENSITY, EXACT)
+
+EXACT_LIMIT = 24  # Largest number of candidates the exact search accepts
+
+
+def _weight(container):
+    return container.weight
+
+
+def select_containers(candidates, max_count, max_weight, strategy=FIRST_FIT_DECREASING, value=None):
+    """
+    Chooses which containers to load under a container count limit and a weight limit.
+
+    Strategies:
+        - "first_fit_decreasing": takes the heaviest containers first, skipping any
+          that no longer fit; O(n log n).
+        - "value_density": takes containers in decreasing order of value per ton,
+          skipping any that no longer fit; O(n log n).
+        - "exact": finds the subset with the highest total value by branch and bound;
+          only for up to EXACT_LIMIT candidates.
+
+    Args:
+        candidates (list): The containers to choose from.
+        max_count (int): The number of containers that can still be loaded.
+        max_weight (float): The weight that can still be loaded.
+        strategy (str): One of STRATEGIES.
+        value (callable): Returns the value of a container; defaults to its weight,
+            so the loaded tonnage is maximized.
+
+    Returns:
+        tuple: The selected containers and the rejected ones, each in candidate order.
+
+    Raises:
+        ValueError: If the strategy is unknown or too many candidates are given for the exact search.
+    """
+    if value is None:
+        value = _weight
+    if strategy == EXACT:
+        chosen = _exact(candidates, max_count, max_weight, value)
+    elif strategy in (FIRST_FIT_DECREASING, VALUE_DENSITY):
+        if strategy == FIRST_FIT_DECREASING:
+            order = sorted(range(len(candidates)), key=lambda i: candidates[i].weight, reverse=True)
+        else:
+            order = sorted(range(len(candidates)), key=lambda i: _density_key(candidates[i], value))
+        chosen = set()
+        weight = 0.0
+        for i in order:
+            if len(chosen) >= max_count:
+                break
+            container_weight = candidates[i].weight
+            if weight + container_weight <= max_weight:
+                chosen.add(i)
+                weight += container_weight
+    else:
+        raise ValueError(f"Unknown loading strategy: {strategy!r}")
+    selected = [c for i, c in enumerate(candidates) if i in chosen]
+    rejected = [c for i, c in enumerate(candidates) if i not in chosen]
+    return selected, rejected
+
+
+def _density_key(container, value):
+    # Highest value per ton first; weightless containers first of all; lighter ones break ties
+    if container.weight <= 0:
+        return (0, -value(container), container.weight)
+    return (1, -value(container) / container.weight, container.weight)
+
+
+def _exact(candidates, max_count, max_weight, value):
+    if len(candidates) > EXACT_LIMIT:
+        raise ValueError(f"The exact strategy accepts at most {EXACT_LIMIT} candidates, got {len(candidates)}")
+    order = sorted(range(len(candidates)), key=lambda i: _density_key(candidates[i], value))
+    weights = [candidates[i].weight for i in order]
+    values = [value(candidates[i]) for i in order]
+    n = len(order)
+    best_value = 0.0
+    best = []
+    taken = []
+
+    def bound(k, remaining_count, remaining_weight):
+        # The smaller of two relaxations over the items left: the fractional knapsack
+        # (ignoring the count limit) and the most valuable items (ignoring the weight limit)
+        by_weight = 0.0
+        for j in range(k, n):
+            if values[j] <= 0:
+                continue
+            if weights[j] <= remaining_weight:
+                remaining_weight -= weights[j]
+                by_weight += values[j]
+            else:
+                by_weight += values[j] * remaining_weight / weights[j]
+                break
+        by_count = sum(sorted((v for v in values[k:] if v > 0), reverse=True)[:remaining_count])
+        return min(by_weight, by_count)
+
+    def search(k, count, weight, total):
+        nonlocal best_value, best
+        if total > best_value:
+            best_value = total
+            best = list(taken)
+        if k == n or count == max_count:
+            return
+        if total + bound(k, max_count - count, max_weight - weight) <= best_value:
+            return
+        if weight + weights[k] <= max_weight:
+            taken.append(order[k])
+            search(k + 1, count + 1, weight + weights[k], total + values[k])
+            taken.pop()
+        search(k + 1, count, weight, total)
+
+    search(0, 0, 0.0, 0.0)
+    return set(best)
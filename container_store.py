@@ -0,0 +1,232 @@
+from array import array
+from container import Container, CONTAINER_TYPES, CONTAINER_TYPE_CODES
+
+_TYPE_NAMES = list(CONTAINER_TYPES)
+
+
+class ContainerView(Container):
+    """
+    A lightweight handle on one row of a ContainerStore that behaves like a Container.
+
+    The view holds only a reference to the store and a row number; its ID and weight
+    are read from and written to the columns of the store.
+    """
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        """
+        Initializes the view over the given row of the store.
+
+        Args:
+            store (ContainerStore): The store that holds the container data.
+            index (int): The row of the container in the store.
+        """
+        self._store = store
+        self._index = index
+
+    @property
+    def container_id(self):
+        return self._store.ids[self._index]
+
+    @container_id.setter
+    def container_id(self, value):
+        self._store.ids[self._index] = value
+
+    @property
+    def weight(self):
+        return self._store.weights[self._index]
+
+    @weight.setter
+    def weight(self, value):
+        self._store.weights[self._index] = value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.container_id}, {self.weight})"
+
+    def detach(self) -> Container:
+        """
+        Creates a standalone container object with the data of the view.
+
+        Returns:
+            Container: An instance of the container class the view stands for.
+        """
+        return CONTAINER_TYPES[_TYPE_NAMES[self._store.codes[self._index]]](self.container_id, self.weight)
+
+
+# One view class per container type, so that views keep the consumption() of the
+# type they stand for and pass the same isinstance checks as the real objects
+_VIEW_CLASSES = [
+    type(container_class.__name__ + 'View', (ContainerView, container_class), {'__slots__': ()})
+    for container_class in CONTAINER_TYPES.values()
+]
+
+_CODE_BY_CLASS = {container_class: code for code, container_class in enumerate(CONTAINER_TYPES.values())}
+_CODE_BY_CLASS.update({view_class: code for code, view_class in enumerate(_VIEW_CLASSES)})
+
+
+class ContainerStore:
+    """
+    A columnar store of containers.
+
+    Container IDs are kept in an int64 array, weights in a float64 array and the
+    type of each container as a uint8 code (see CONTAINER_TYPE_CODES), which costs
+    17 bytes per container instead of a full Python object. Items are returned as
+    ContainerView objects, so the store can stand in for a list of containers.
+
+    Attributes:
+        ids (array): The container IDs.
+        weights (array): The container weights in tons.
+        codes (array): The container type codes.
+    """
+
+    def __init__(self, containers=()):
+        """
+        Initializes the store, optionally filling it from existing containers.
+
+        Args:
+            containers (iterable): Container objects to copy into the store.
+        """
+        self.ids = array('q')
+        self.weights = array('d')
+        self.codes = array('B')
+        for container in containers:
+            self.append(container)
+
+    @classmethod
+    def from_columns(cls, ids, weights, codes):
+        """
+        Creates a store over existing columns without copying them.
+
+        Args:
+            ids: A sequence of container IDs, such as an array or a memoryview.
+            weights: A sequence of container weights of the same length.
+            codes: A sequence of container type codes of the same length.
+
+        Returns:
+            ContainerStore: A store backed by the given columns.
+        """
+        if not len(ids) == len(weights) == len(codes):
+            raise ValueError("columns must have the same length")
+        store = cls.__new__(cls)
+        store.ids = ids
+        store.weights = weights
+        store.codes = codes
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        """
+        Returns a view of the container at the given position.
+
+        Args:
+            index (int): The position of the container; negative values count from the end.
+
+        Returns:
+            ContainerView: A view of the container.
+        """
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError("container index out of range")
+        return _VIEW_CLASSES[self.codes[index]](self, index)
+
+    def __iter__(self):
+        view_classes = _VIEW_CLASSES
+        for index, code in enumerate(self.codes):
+            yield view_classes[code](self, index)
+
+    def __contains__(self, container):
+        return self.index(container) >= 0
+
+    def add(self, container_id, weight, type_name) -> ContainerView:
+        """
+        Appends a container given by its fields.
+
+        Args:
+            container_id (int): The unique identifier for the container.
+            weight (float): The weight of the container in tons.
+            type_name (str): One of the keys of CONTAINER_TYPES.
+
+        Returns:
+            ContainerView: A view of the appended container.
+        """
+        code = CONTAINER_TYPE_CODES[type_name]
+        self.ids.append(container_id)
+        self.weights.append(weight)
+        self.codes.append(code)
+        return _VIEW_CLASSES[code](self, len(self.ids) - 1)
+
+    def append(self, container: Container):
+        """
+        Appends a copy of a container object.
+
+        Args:
+            container (Container): A container of one of the types in CONTAINER_TYPES.
+        """
+        code = _CODE_BY_CLASS.get(type(container))
+        if code is None:
+            raise ValueError(f"Unsupported container type: {type(container).__name__}")
+        self.ids.append(container.container_id)
+        self.weights.append(container.weight)
+        self.codes.append(code)
+
+    def extend(self, containers):
+        """
+        Appends copies of several container objects.
+
+        Args:
+            containers (iterable): The containers to append.
+        """
+        for container in containers:
+            self.append(container)
+
+    def index(self, container: Container) -> int:
+        """
+        Finds the position of a container equal to the given one.
+
+        Args:
+            container (Container): The container to look for.
+
+        Returns:
+            int: The position of the first container with the same ID and weight, or -1.
+        """
+        container_id, weight = container.container_id, container.weight
+        ids, weights = self.ids, self.weights
+        for index, stored_id in enumerate(ids):
+            if stored_id == container_id and weights[index] == weight:
+                return index
+        return -1
+
+    def remove(self, container: Container):
+        """
+        Removes the first container equal to the given one.
+
+        Views of rows after the removed one shift by one position.
+
+        Args:
+            container (Container): The container to remove.
+
+        Raises:
+            ValueError: If the container is not in the store.
+        """
+        index = self.index(container)
+        if index < 0:
+            raise ValueError("container not in store")
+        del self.ids[index]
+        del self.weights[index]
+        del self.codes[index]
+
+    def type_name(self, index) -> str:
+        """
+        Returns the type name of the container at the given position.
+
+        Args:
+            index (int): The position of the container.
+
+        Returns:
+            str: One of the keys of CONTAINER_TYPES.
+        """
+        return _TYPE_NAMES[self.codes[index]]
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+
+
+class DistanceCache:
+    """
+    A bounded, symmetric LRU cache of distances between pairs of ports.
+
+    Entries are keyed by the unordered pair of port IDs, so the distance from
+    port A to port B and from port B to port A share one entry. When the cache
+    is full, the least recently used entry is evicted.
+
+    Attributes:
+        maxsize (int): The maximum number of port pairs kept in the cache.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to be computed.
+        evictions (int): The number of entries dropped because the cache was full.
+    """
+
+    def __init__(self, maxsize=4096):
+        """
+        Initializes an empty cache with the given size limit.
+
+        Args:
+            maxsize (int): The maximum number of port pairs kept in the cache.
+        """
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (low_id, high_id) -> distance
+        self._keys_by_port = {}  # port_id -> set of keys that involve the port
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(port_id, other_port_id):
+        return (port_id, other_port_id) if port_id <= other_port_id else (other_port_id, port_id)
+
+    def get(self, port_id, other_port_id):
+        """
+        Looks up the cached distance between two ports.
+
+        Args:
+            port_id (int): The ID of the first port.
+            other_port_id (int): The ID of the second port.
+
+        Returns:
+            float: The cached distance in kilometers, or None if the pair is not cached.
+        """
+        key = self._key(port_id, other_port_id)
+        distance = self._entries.get(key)
+        if distance is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return distance
+
+    def put(self, port_id, other_port_id, distance):
+        """
+        Stores the distance between two ports, evicting the least recently used pair if needed.
+
+        Args:
+            port_id (int): The ID of the first port.
+            other_port_id (int): The ID of the second port.
+            distance (float): The distance in kilometers between the ports.
+        """
+        if self.maxsize == 0:
+            return
+        key = self._key(port_id, other_port_id)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            if len(self._entries) >= self.maxsize:
+                self._forget(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+            self._keys_by_port.setdefault(key[0], set()).add(key)
+            self._keys_by_port.setdefault(key[1], set()).add(key)
+        self._entries[key] = distance
+
+    def _forget(self, key):
+        for port_id in key:
+            keys = self._keys_by_port.get(port_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_port[port_id]
+
+    def invalidate(self, port_id):
+        """
+        Drops every cached distance that involves the given port.
+
+        Args:
+            port_id (int): The ID of the port whose coordinates have changed.
+        """
+        for key in self._keys_by_port.pop(port_id, ()):
+            self._entries.pop(key, None)
+            other_port_id = key[1] if key[0] == port_id else key[0]
+            keys = self._keys_by_port.get(other_port_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_port[other_port_id]
+
+    def clear(self):
+        """
+        Drops all cached distances and resets the hit and miss counters.
+        """
+        self._entries.clear()
+        self._keys_by_port.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            dict: The size, limit, hits, misses, evictions and hit ratio of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
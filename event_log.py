@@ -0,0 +1,423 @@
+import functools
+import glob
+import inspect
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from container import CONTAINER_TYPE_CODES, CONTAINER_TYPES, Container, container_type_name
+
+MAGIC = b"PEVL"
+VERSION = 1
+
+SAIL = "sail_to"
+REFUEL = "refuel"
+LOAD = "load_container"
+UNLOAD = "unload_container"
+INCOMING = "incoming_ship"
+OUTGOING = "outgoing_ship"
+STORE = "add_container"
+RELEASE = "remove_container"
+TRANSFER = "load_from_port"  # One event per container moved from the port onto the ship
+EVENT_KINDS = (SAIL, REFUEL, LOAD, UNLOAD, INCOMING, OUTGOING, STORE, RELEASE, TRANSFER)
+
+_HEADER = struct.Struct("<4sI")  # magic, version
+# kind, container type code, time, ship ID, port ID, origin port ID, container ID, amount
+_RECORD = struct.Struct("<BBxxxxxxdqqqqd")
+_NONE = -1  # Stored for a missing ID
+_NO_TYPE = 255  # Type code of a container that is not of a registered type
+_TYPE_NAMES = list(CONTAINER_TYPE_CODES)
+
+# One event. seq is its position in the log; IDs that do not apply are None. amount is the
+# fuel burnt by a voyage or taken on by refuelling, or the weight of the container moved.
+Event = namedtuple('Event', 'seq time kind ship_id port_id from_port_id container_id amount')
+
+_attached = []  # EventLogs receiving events
+_depth = 0  # Nesting of logged calls; calls made inside a logged call are part of it
+_installed = False
+
+
+def _install():
+    """
+    Wraps the mutating methods of Port and Ship so that attached logs see every change.
+
+    The wrappers are layers of the hooks module, so other layers such as Instrumentation
+    can be added and removed around them in any order.
+    """
+    global _installed
+    if _installed:
+        return
+    import hooks
+    from port import Port
+    from ship import Ship
+
+    def wrap(owner, name, before, after):
+        signature = inspect.signature(getattr(owner, name))
+
+        def layer(original):
+            def wrapper(target, *args, **kwargs):
+                global _depth
+                if _depth or not _attached:
+                    return original(target, *args, **kwargs)
+                if kwargs:
+                    # Logged with the arguments in order, whichever way they were passed
+                    bound = signature.bind(target, *args, **kwargs)
+                    args, kwargs = bound.args[1:], bound.kwargs
+                state = before(target, *args)
+                _depth += 1
+                try:
+                    result = original(target, *args, **kwargs)
+                finally:
+                    _depth -= 1
+                if result is not False:
+                    for log in _attached:
+                        log._observe(after, target, args, state, result)
+                return result
+            return functools.wraps(original)(wrapper)
+        hooks.add(owner, name, "event_log", layer)
+
+    def nothing(target, *args):
+        return None
+
+    wrap(Ship, "sail_to", lambda ship, port: ship.current_port, SAIL)
+    wrap(Ship, "refuel", nothing, REFUEL)
+    wrap(Ship, "load_container", nothing, LOAD)
+    wrap(Ship, "unload_container", nothing, UNLOAD)
+    wrap(Ship, "load_from_port", nothing, TRANSFER)
+    # Arrivals and departures are logged only when they change the port
+    wrap(Port, "incoming_ship", lambda port, ship: ship not in port.current_ships or ship not in port.history, INCOMING)
+    wrap(Port, "outgoing_ship", lambda port, ship: ship in port.current_ships, OUTGOING)
+    wrap(Port, "add_container", nothing, STORE)
+    wrap(Port, "remove_container", nothing, RELEASE)
+    _installed = True
+
+
+class EventLog:
+    """
+    An append-only binary log of the changes made to a world, with checkpoints and replay.
+
+    Every successful Ship.sail_to(), Ship.refuel(), Ship.load_container(),
+    Ship.unload_container(), Port.incoming_ship(), Port.outgoing_ship(),
+    Port.add_container() and Port.remove_container() on an attached world is stored as
+    a fixed-size record with a timestamp, as is each container moved by Ship.load_from_port(). Calls made from inside another logged call
+    (the arrival and departure of a voyage) are part of the outer event. Direct
+    assignments to Ship.fuel or Ship.current_port bypass the log; the next checkpoint
+    picks them up.
+
+    Every checkpoint_interval events the whole world is saved with world_file.save_world()
+    next to the log, so replay() starts from the nearest checkpoint instead of the start.
+    Events are indexed in memory by ship, port and time, so queries read only the
+    matching records.
+
+    Attributes:
+        path (str): The path of the log file.
+        checkpoint_interval (int): The number of events between checkpoints; 0 disables them.
+    """
+
+    def __init__(self, path, checkpoint_interval=10000):
+        """
+        Opens a log, creating it if needed, and indexes the events it already holds.
+
+        Args:
+            path (str): The path of the log file.
+            checkpoint_interval (int): The number of events between checkpoints; 0 disables them.
+
+        Raises:
+            ValueError: If the file is not an event log or has an unsupported version.
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self._ports = None
+        self._ships = None
+        self._times = array('d')
+        self._by_ship = {}
+        self._by_port = {}
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, VERSION))
+        self._reader = open(path, 'rb')
+        magic, version = _HEADER.unpack(self._reader.read(_HEADER.size).ljust(_HEADER.size, b"\0"))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        if version != VERSION:
+            raise ValueError(f"Unsupported event log version {version} (expected {VERSION})")
+        while True:
+            chunk = self._reader.read(_RECORD.size * 4096)
+            chunk = chunk[:len(chunk) - len(chunk) % _RECORD.size]  # A torn last record is ignored
+            if not chunk:
+                break
+            for record in _RECORD.iter_unpack(chunk):
+                self._index(record)
+        self._writer = open(path, 'r+b')
+        self._writer.seek(_HEADER.size + _RECORD.size * len(self._times))
+        self._writer.truncate()
+        self._checkpoints = sorted(self._checkpoint_seq(name) for name in glob.glob(glob.escape(path) + ".*.pwld"))
+
+    def __len__(self):
+        return len(self._times)
+
+    def _checkpoint_path(self, seq):
+        return f"{self.path}.{seq:012d}.pwld"
+
+    def _checkpoint_seq(self, name):
+        return int(name[len(self.path) + 1:-len(".pwld")])
+
+    def _index(self, record):
+        seq = len(self._times)
+        self._times.append(record[2])
+        ship_id, port_id, from_port_id = record[3], record[4], record[5]
+        if ship_id != _NONE:
+            self._by_ship.setdefault(ship_id, array('q')).append(seq)
+        for key in (port_id, from_port_id):
+            if key != _NONE:
+                self._by_port.setdefault(key, array('q')).append(seq)
+
+    def attach(self, ports, ships):
+        """
+        Starts logging the changes of a world and saves a checkpoint of its current state.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID.
+        """
+        _install()
+        self._ports = ports
+        self._ships = ships
+        if self not in _attached:
+            _attached.append(self)
+        self.checkpoint()
+
+    def detach(self):
+        """
+        Stops logging.
+        """
+        if self in _attached:
+            _attached.remove(self)
+        self._ports = self._ships = None
+
+    def close(self):
+        """
+        Stops logging and closes the file.
+        """
+        self.detach()
+        self._writer.close()
+        self._reader.close()
+
+    def checkpoint(self):
+        """
+        Saves the attached world, as it is after the events logged so far.
+        """
+        from world_file import save_world
+        seq = len(self._times)
+        save_world(self._checkpoint_path(seq), self._ports, self._ships)
+        if seq not in self._checkpoints:
+            self._checkpoints.append(seq)
+
+    def checkpoints(self) -> list:
+        """
+        Returns the positions of the saved checkpoints.
+
+        Returns:
+            list: For each checkpoint, in order, the number of events logged before it.
+        """
+        return list(self._checkpoints)
+
+    def _observe(self, kind, target, args, state, result):
+        if kind == TRANSFER:
+            if self._ships.get(target.ship_id) is target:
+                for container in result[0]:
+                    self._append(kind, target, target.current_port, _NONE, container, container.weight)
+            return
+        if kind in (SAIL, REFUEL, LOAD, UNLOAD):
+            ship, port = target, target.current_port
+            if self._ships.get(ship.ship_id) is not ship:
+                return
+        else:
+            ship, port = (args[0], target) if kind in (INCOMING, OUTGOING) else (None, target)
+            if self._ports.get(port.port_id) is not port:
+                return
+        if kind in (INCOMING, OUTGOING) and not state:
+            return
+        container = args[0] if kind in (LOAD, UNLOAD, STORE, RELEASE) else None
+        from_port_id = _NONE
+        amount = 0.0
+        if kind == SAIL:
+            # Recomputed as Ship.sail_to() does, so that replay subtracts exactly the same amount
+            from_port_id = state.port_id
+            amount = state.get_distance(port) * ship.fuel_consumption_per_km
+        elif kind == REFUEL:
+            amount = args[0]
+        elif container is not None:
+            amount = container.weight
+        self._append(kind, ship, port, from_port_id, container, amount)
+
+    def _append(self, kind, ship, port, from_port_id, container, amount):
+        # Timestamps never go backwards, so time ranges can be found by bisection
+        now = time.time()
+        if self._times and now < self._times[-1]:
+            now = self._times[-1]
+        type_name = container_type_name(container) if container is not None else None
+        record = (
+            EVENT_KINDS.index(kind),
+            CONTAINER_TYPE_CODES[type_name] if type_name is not None else _NO_TYPE,
+            now,
+            ship.ship_id if ship is not None else _NONE,
+            port.port_id if port is not None else _NONE,
+            from_port_id,
+            container.container_id if container is not None else _NONE,
+            amount
+        )
+        self._writer.write(_RECORD.pack(*record))
+        self._index(record)
+        if self.checkpoint_interval and len(self._times) % self.checkpoint_interval == 0:
+            self._writer.flush()
+            self.checkpoint()
+
+    def _read(self, seq):
+        self._writer.flush()
+        self._reader.seek(_HEADER.size + _RECORD.size * seq)
+        return self._event(seq, _RECORD.unpack(self._reader.read(_RECORD.size)))
+
+    @staticmethod
+    def _event(seq, record):
+        kind, _, when, ship_id, port_id, from_port_id, container_id, amount = record
+        return Event(seq, when, EVENT_KINDS[kind], *(None if value == _NONE else value
+                                                     for value in (ship_id, port_id, from_port_id, container_id)),
+                     amount)
+
+    def events(self, start=0, stop=None) -> list:
+        """
+        Reads a range of events.
+
+        Args:
+            start (int): The position of the first event.
+            stop (int): The position after the last event, or None for the end of the log.
+
+        Returns:
+            list: The events, in order.
+        """
+        stop = len(self._times) if stop is None else min(stop, len(self._times))
+        if start >= stop:
+            return []
+        self._writer.flush()
+        self._reader.seek(_HEADER.size + _RECORD.size * start)
+        data = self._reader.read(_RECORD.size * (stop - start))
+        return [self._event(seq, record) for seq, record in enumerate(_RECORD.iter_unpack(data), start)]
+
+    def _time_range(self, seqs, start_time, end_time):
+        times = self._times
+        low = 0 if start_time is None else bisect_left(seqs, start_time, key=times.__getitem__)
+        high = len(seqs) if end_time is None else bisect_right(seqs, end_time, key=times.__getitem__)
+        return seqs[low:high]
+
+    def between(self, start_time=None, end_time=None) -> list:
+        """
+        Returns the events logged in a time range.
+
+        Args:
+            start_time (float): The earliest time.time() value, or None for no limit.
+            end_time (float): The latest time.time() value, or None for no limit.
+
+        Returns:
+            list: The events, in order.
+        """
+        start = 0 if start_time is None else bisect_left(self._times, start_time)
+        stop = len(self._times) if end_time is None else bisect_right(self._times, end_time)
+        return self.events(start, stop)
+
+    def for_ship(self, ship_id, start_time=None, end_time=None) -> list:
+        """
+        Returns the events of a ship, optionally limited to a time range.
+
+        Args:
+            ship_id (int): The ID of the ship.
+            start_time (float): The earliest time.time() value, or None for no limit.
+            end_time (float): The latest time.time() value, or None for no limit.
+
+        Returns:
+            list: The events, in order.
+        """
+        seqs = self._by_ship.get(ship_id, array('q'))
+        return [self._read(seq) for seq in self._time_range(seqs, start_time, end_time)]
+
+    def for_port(self, port_id, start_time=None, end_time=None) -> list:
+        """
+        Returns the events at a port, including voyages from and to it, optionally limited to a time range.
+
+        Args:
+            port_id (int): The ID of the port.
+            start_time (float): The earliest time.time() value, or None for no limit.
+            end_time (float): The latest time.time() value, or None for no limit.
+
+        Returns:
+            list: The events, in order.
+        """
+        seqs = self._by_port.get(port_id, array('q'))
+        return [self._read(seq) for seq in self._time_range(seqs, start_time, end_time)]
+
+    def replay(self, seq=None, at_time=None) -> tuple:
+        """
+        Rebuilds the world as it was at a point of the log.
+
+        The nearest earlier checkpoint is loaded and the events after it are applied.
+
+        Args:
+            seq (int): The number of events to apply; None for all of them.
+            at_time (float): Alternatively, the time.time() value to rebuild the world at.
+
+        Returns:
+            tuple: Dicts of the rebuilt ports and ships keyed by ID.
+
+        Raises:
+            ValueError: If there is no checkpoint at or before that point.
+        """
+        from world_file import load_world
+        if at_time is not None:
+            seq = bisect_right(self._times, at_time)
+        elif seq is None:
+            seq = len(self._times)
+        base = max((checkpoint for checkpoint in self._checkpoints if checkpoint <= seq), default=None)
+        if base is None:
+            raise ValueError(f"No checkpoint at or before event {seq}")
+        ports, ships, containers = load_world(self._checkpoint_path(base)).materialize()
+
+        def container_of(event, code):
+            container = containers.get(event.container_id)
+            if container is None:
+                container_class = CONTAINER_TYPES[_TYPE_NAMES[code]] if code != _NO_TYPE else Container
+                container = containers[event.container_id] = container_class(event.container_id, event.amount)
+            return container
+
+        self._writer.flush()
+        self._reader.seek(_HEADER.size + _RECORD.size * base)
+        data = self._reader.read(_RECORD.size * (seq - base))
+        for position, record in enumerate(_RECORD.iter_unpack(data), base):
+            event = self._event(position, record)
+            ship = ships.get(event.ship_id)
+            port = ports.get(event.port_id)
+            if event.kind == SAIL:
+                ship.current_port.outgoing_ship(ship)
+                port.incoming_ship(ship)
+                ship.current_port = port
+                ship.fuel -= event.amount
+            elif event.kind == REFUEL:
+                ship.refuel(event.amount)
+            elif event.kind == LOAD:
+                ship.load_container(container_of(event, record[1]))
+            elif event.kind == UNLOAD:
+                ship.unload_container(container_of(event, record[1]))
+            elif event.kind == INCOMING:
+                port.incoming_ship(ship)
+            elif event.kind == OUTGOING:
+                port.outgoing_ship(ship)
+            elif event.kind == TRANSFER:
+                container = container_of(event, record[1])
+                ship.current_port.remove_container(container)
+                ship.load_container(container)
+            elif event.kind == STORE:
+                port.add_container(container_of(event, record[1]))
+            else:
+                port.remove_container(container_of(event, record[1]))
+        return ports, ships
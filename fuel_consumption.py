@@ -0,0 +1,119 @@
+from container import Container, CONTAINER_TYPES, FUEL_RATES, container_type_name
+from container_store import ContainerStore
+
+_TYPE_NAMES = list(CONTAINER_TYPES)
+_RATES_BY_CODE = [FUEL_RATES[type_name] for type_name in _TYPE_NAMES]
+
+
+def _empty_totals():
+    return {type_name: 0.0 for type_name in _TYPE_NAMES}
+
+
+def batch_consumption(containers):
+    """
+    Calculates the total and per-type fuel consumption of many containers in one pass.
+
+    Weights are summed per type first and multiplied by the FUEL_RATES coefficient
+    once per type, instead of calling consumption() on every container. A
+    ContainerStore is summed straight from its weight and type code columns.
+
+    Args:
+        containers (iterable): The containers, or a ContainerStore.
+
+    Returns:
+        tuple: The total consumption and a dict of the consumption per container type.
+    """
+    if isinstance(containers, ContainerStore):
+        weight_by_code = [0.0] * len(_TYPE_NAMES)
+        for code, weight in zip(containers.codes, containers.weights):
+            weight_by_code[code] += weight
+        by_type = {type_name: weight_by_code[code] * _RATES_BY_CODE[code]
+                   for code, type_name in enumerate(_TYPE_NAMES)}
+        return sum(by_type.values()), by_type
+
+    weight_by_type = _empty_totals()
+    other = 0.0  # Containers of no registered type use their own consumption()
+    for container in containers:
+        type_name = container_type_name(container)
+        if type_name is None:
+            other += container.consumption()
+        else:
+            weight_by_type[type_name] += container.weight
+    by_type = {type_name: weight * FUEL_RATES[type_name] for type_name, weight in weight_by_type.items()}
+    return sum(by_type.values()) + other, by_type
+
+
+class ConsumptionTracker:
+    """
+    Keeps running fuel consumption totals of a changing set of containers.
+
+    The tracker stores the summed weight per container type, so adding or removing
+    a container and reading the totals are all O(1).
+
+    Attributes:
+        weight_by_type (dict): The summed weight of the tracked containers per type.
+        other (float): The consumption of tracked containers of no registered type.
+    """
+
+    def __init__(self, containers=()):
+        """
+        Initializes the tracker with the given containers.
+
+        Args:
+            containers (iterable): The containers that are already loaded.
+        """
+        self.reset(containers)
+
+    def reset(self, containers=()):
+        """
+        Recomputes the totals from scratch for the given containers.
+
+        Args:
+            containers (iterable): The containers to track.
+        """
+        self.weight_by_type = _empty_totals()
+        self.other = 0.0
+        for container in containers:
+            self.add(container)
+
+    def add(self, container: Container):
+        """
+        Adds a container to the running totals.
+
+        Args:
+            container (Container): The container that was loaded.
+        """
+        type_name = container_type_name(container)
+        if type_name is None:
+            self.other += container.consumption()
+        else:
+            self.weight_by_type[type_name] += container.weight
+
+    def remove(self, container: Container):
+        """
+        Removes a container from the running totals.
+
+        Args:
+            container (Container): The container that was unloaded.
+        """
+        type_name = container_type_name(container)
+        if type_name is None:
+            self.other -= container.consumption()
+        else:
+            self.weight_by_type[type_name] -= container.weight
+
+    @property
+    def total(self) -> float:
+        """
+        float: The total fuel consumption of the tracked containers.
+        """
+        return sum(weight * FUEL_RATES[type_name] for type_name, weight in self.weight_by_type.items()) + self.other
+
+    def by_type(self) -> dict:
+        """
+        Returns the fuel consumption of the tracked containers per type.
+
+        Returns:
+            dict: The consumption keyed by container type name.
+        """
+        return {type_name: weight * FUEL_RATES[type_name] for type_name, weight in self.weight_by_type.items()}
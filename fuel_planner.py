@@ -0,0 +1,396 @@
+import multiprocessing
+import random
+import time
+from port_registry import PortRegistry
+
+# Nearest ports whose stops are tried as the predecessor of a relocated trip
+NEIGHBOR_PORTS = 5
+# Ships compared for each trip by the greedy start
+GREEDY_CANDIDATES = 8
+# Parallel local search rounds; ships are regrouped at random between rounds
+ROUNDS = 4
+
+_matrix = None  # Distance rows in kilometers, set in each worker by _init_worker
+_nearest_rows = {}  # port row -> all port rows ordered by distance, built on demand
+
+
+class Trip:
+    """
+    One loaded voyage of a planned route.
+
+    The ship first sails empty from wherever it is to the origin, then carries
+    the containers to the destination.
+
+    Attributes:
+        origin_id (int): The ID of the port the containers are picked up at.
+        destination_id (int): The ID of the port the containers are delivered to.
+        containers (list): The containers carried.
+    """
+
+    __slots__ = ('origin_id', 'destination_id', 'containers')
+
+    def __init__(self, origin_id, destination_id, containers):
+        self.origin_id = origin_id
+        self.destination_id = destination_id
+        self.containers = containers
+
+
+class FleetPlan:
+    """
+    The outcome of plan_fleet().
+
+    Attributes:
+        routes (dict): Lists of Trip keyed by ship ID, in sailing order; idle ships are left out.
+        fuel (float): The fuel the plan needs.
+        initial_fuel (float): The fuel of the greedy plan the local search started from.
+        cargo_fuel (float): The part of both that is spent on carrying the containers, the same for every plan.
+        unassigned (list): Containers no ship can carry.
+        elapsed (float): The wall time of the planning in seconds.
+        processes (int): The number of worker processes used.
+    """
+
+    def __init__(self, routes, fuel, initial_fuel, cargo_fuel, unassigned, elapsed, processes):
+        self.routes = routes
+        self.fuel = fuel
+        self.initial_fuel = initial_fuel
+        self.cargo_fuel = cargo_fuel
+        self.unassigned = unassigned
+        self.elapsed = elapsed
+        self.processes = processes
+
+    def as_dict(self) -> dict:
+        """
+        Returns the plan as a plain dictionary.
+
+        Returns:
+            dict: The routes as lists of (origin ID, destination ID, container IDs) and the other fields.
+        """
+        return {
+            "routes": {ship_id: [(trip.origin_id, trip.destination_id, [c.container_id for c in trip.containers])
+                                 for trip in trips] for ship_id, trips in self.routes.items()},
+            "fuel": self.fuel,
+            "initial_fuel": self.initial_fuel,
+            "cargo_fuel": self.cargo_fuel,
+            "unassigned": [container.container_id for container in self.unassigned],
+            "elapsed": self.elapsed,
+            "processes": self.processes
+        }
+
+
+def collect_shipments(ports, destinations) -> list:
+    """
+    Lists the containers stored at ports that have to go somewhere else.
+
+    Args:
+        ports (dict): The ports keyed by port ID.
+        destinations (dict): Destination port IDs keyed by container ID.
+
+    Returns:
+        list: Tuples of (container, origin port, destination port) for plan_fleet().
+    """
+    shipments = []
+    for port in ports.values():
+        for container in port.containers:
+            destination_id = destinations.get(container.container_id)
+            if destination_id is not None and destination_id != port.port_id:
+                shipments.append((container, port, ports[destination_id]))
+    return shipments
+
+
+def _init_worker(matrix):
+    global _matrix
+    _matrix = matrix
+    _nearest_rows.clear()
+
+
+def _nearest(row):
+    order = _nearest_rows.get(row)
+    if order is None:
+        distances = _matrix[row]
+        order = _nearest_rows[row] = sorted(range(len(distances)), key=distances.__getitem__)
+    return order
+
+
+def _pack_trips(lanes, max_count, max_weight):
+    """
+    Packs the containers of each lane into trips first-fit decreasing by weight.
+
+    A container heavier than max_weight gets a trip of its own.
+    """
+    trips = []
+    for (origin, destination), containers in lanes.items():
+        bins = []
+        for container in sorted(containers, key=lambda c: -c.weight):
+            for trip in bins:
+                if len(trip[0]) < max_count and trip[1] + container.weight <= max_weight:
+                    trip[0].append(container)
+                    trip[1] += container.weight
+                    break
+            else:
+                bins.append([[container], container.weight])
+        trips.extend((origin, destination, members, weight) for members, weight in bins)
+    return trips
+
+
+def _greedy(starts, rates, cap_count, cap_weight, jobs):
+    """
+    Appends every trip, longest first, to the cheapest of the ships that end up nearest to its origin.
+
+    Returns:
+        tuple: The list of trip indices per ship and the indices of trips no ship can carry.
+    """
+    matrix = _matrix
+    ends = list(starts)
+    ships_at = {}
+    for s, row in enumerate(starts):
+        ships_at.setdefault(row, set()).add(s)
+    routes = [[] for _ in starts]
+    unassigned = []
+    for j in sorted(range(len(jobs)), key=lambda j: -matrix[jobs[j][0]][jobs[j][1]]):
+        origin, destination, count, weight = jobs[j]
+        from_origin = matrix[origin]
+        loaded = from_origin[destination]
+        candidates = []
+        for row in _nearest(origin):
+            candidates.extend(s for s in ships_at.get(row, ()) if count <= cap_count[s] and weight <= cap_weight[s])
+            if len(candidates) >= GREEDY_CANDIDATES:
+                break
+        if not candidates:
+            unassigned.append(j)
+            continue
+        best = min(candidates, key=lambda s: rates[s] * (from_origin[ends[s]] + loaded))
+        routes[best].append(j)
+        ships_at[ends[best]].discard(best)
+        ends[best] = destination
+        ships_at.setdefault(destination, set()).add(best)
+    return routes, unassigned
+
+
+def _improve(task):
+    """
+    Improves the routes of a group of ships by relocating trips until nothing improves or time runs out.
+
+    A trip is taken out of its route and the cost of putting it back after every stop that
+    ends at one of the ports nearest to its origin is evaluated, port by port, sharing the
+    empty voyage to the origin; the cheapest place wins if it beats the original one.
+    Routes are linked lists, so a move costs O(1).
+
+    Args:
+        task (tuple): Start rows, rates, count and weight limits and routes of the ships,
+            the trips by index as (origin row, destination row, count, weight), the
+            monotonic deadline and the random seed.
+
+    Returns:
+        list: The improved list of trip indices per ship.
+    """
+    starts, rates, cap_count, cap_weight, routes, jobs, deadline, seed = task
+    matrix = _matrix
+    rng = random.Random(seed)
+    head = [None] * len(starts)
+    following, preceding, owner = {}, {}, {}
+    ending_at, starting_at = {}, {}  # port row -> trips ending there / ships starting there
+    for s, route in enumerate(routes):
+        previous = None
+        for j in route:
+            owner[j], preceding[j], following[j] = s, previous, None
+            if previous is None:
+                head[s] = j
+            else:
+                following[previous] = j
+            previous = j
+            ending_at.setdefault(jobs[j][1], set()).add(j)
+        starting_at.setdefault(starts[s], set()).add(s)
+
+    def insertion_cost(s, p, origin, destination):
+        # Extra fuel of ship s for sailing the trip right after trip p (None: first)
+        a = starts[s] if p is None else jobs[p][1]
+        b = head[s] if p is None else following[p]
+        from_origin = matrix[origin]
+        extra = from_origin[a] + from_origin[destination]
+        if b is not None:
+            b = jobs[b][0]
+            extra += matrix[destination][b] - matrix[a][b]
+        return rates[s] * extra
+
+    def unlink(j):
+        p, n = preceding[j], following[j]
+        if p is None:
+            head[owner[j]] = n
+        else:
+            following[p] = n
+        if n is not None:
+            preceding[n] = p
+        ending_at[jobs[j][1]].discard(j)
+
+    def link(j, s, p):
+        n = head[s] if p is None else following[p]
+        owner[j], preceding[j], following[j] = s, p, n
+        if p is None:
+            head[s] = j
+        else:
+            following[p] = j
+        if n is not None:
+            preceding[n] = j
+        ending_at[jobs[j][1]].add(j)
+
+    order = list(owner)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        rng.shuffle(order)
+        for step, j in enumerate(order):
+            if step % 64 == 0 and time.monotonic() >= deadline:
+                break
+            origin, destination, count, weight = jobs[j]
+            s, p = owner[j], preceding[j]
+            unlink(j)
+            current = insertion_cost(s, p, origin, destination)
+            from_origin, from_destination = matrix[origin], matrix[destination]
+            loaded = from_origin[destination]
+            best_cost, best = current - 1e-9, None
+            for row in _nearest(origin)[:NEIGHBOR_PORTS]:
+                # Every place after a stop at this port shares the empty voyage to the origin
+                base = from_origin[row] + loaded
+                from_row = matrix[row]
+                places = [(owner[q], q, following[q]) for q in ending_at.get(row, ())]
+                places += [(t, None, head[t]) for t in starting_at.get(row, ())]
+                for t, q, n in places:
+                    if count > cap_count[t] or weight > cap_weight[t]:
+                        continue
+                    if n is None:
+                        cost = rates[t] * base
+                    else:
+                        b = jobs[n][0]
+                        cost = rates[t] * (base + from_destination[b] - from_row[b])
+                    if cost < best_cost:
+                        best_cost, best = cost, (t, q)
+            if best is not None:
+                link(j, best[0], best[1])
+                improved = True
+            else:
+                link(j, s, p)
+
+    result = []
+    for s in range(len(starts)):
+        route = []
+        j = head[s]
+        while j is not None:
+            route.append(j)
+            j = following[j]
+        result.append(route)
+    return result
+
+
+def _route_fuel(start, rate, route, jobs):
+    matrix = _matrix
+    here = start
+    distance = 0.0
+    for j in route:
+        origin, destination = jobs[j][0], jobs[j][1]
+        distance += matrix[here][origin] + matrix[origin][destination]
+        here = destination
+    return rate * distance
+
+
+def plan_fleet(ships, shipments, time_budget=30.0, processes=None, seed=0) -> FleetPlan:
+    """
+    Decides which ships carry which containers, minimizing the total fuel.
+
+    Containers going between the same pair of ports are packed into trips. Every ship
+    sails its trips one after another from its current port: empty to the origin, then
+    loaded to the destination. A voyage costs its distance times the ship's
+    fuel_consumption_per_km, and a loaded one also costs its distance times the summed
+    consumption() of the containers on board, the same figure Ship.fuel_demand() gives.
+    Fuel on board is not limited; ships are assumed to refuel at the ports they call at.
+
+    The plan starts from a greedy assignment and is improved by local search until no
+    move helps or the time budget runs out. The search runs in worker processes, each
+    on a random group of ships, with fresh groups in each of ROUNDS rounds. Every
+    distance comes from a matrix over the ports involved, computed once up front, so
+    the number of ports should stay within a few thousand.
+
+    Args:
+        ships (iterable): The ships available; each must be docked at a port.
+        shipments (iterable): Tuples of (container, origin port, destination port),
+            e.g. from collect_shipments().
+        time_budget (float): The longest time spent planning, in seconds.
+        processes (int): The number of worker processes; None uses the CPU count, 0 or 1
+            searches in the main process.
+        seed (int): The seed of the local search.
+
+    Returns:
+        FleetPlan: The routes of the ships and the fuel they need.
+    """
+    start_time = time.perf_counter()
+    deadline = time.monotonic() + time_budget
+    ships = list(ships)
+    processes = multiprocessing.cpu_count() if processes is None else processes
+
+    # A private registry numbers the ports the plan touches, without taking them from their own
+    registry = PortRegistry(claim=False)
+
+    def row_of(port):
+        if port not in registry:
+            registry.add(port)
+        return registry.row_of(port)
+
+    starts = [row_of(ship.current_port) for ship in ships]
+    rates = [ship.fuel_consumption_per_km for ship in ships]
+    cap_count = [ship.max_containers for ship in ships]
+    cap_weight = [ship.max_weight for ship in ships]
+    lanes = {}
+    for container, origin, destination in shipments:
+        lanes.setdefault((row_of(origin), row_of(destination)), []).append(container)
+
+    matrix = registry.distance_matrix()
+    port_ids = [port.port_id for port in registry.ports]
+    _init_worker(matrix)
+    # Trips are packed for a median ship, so about half the fleet can take any of them
+    trips = _pack_trips(lanes, sorted(cap_count)[len(ships) // 2] if ships else 0,
+                        sorted(cap_weight)[len(ships) // 2] if ships else 0.0)
+    jobs = [(origin, destination, len(members), weight) for origin, destination, members, weight in trips]
+    routes, unassigned = _greedy(starts, rates, cap_count, cap_weight, jobs)
+
+    def total_fuel():
+        return sum(_route_fuel(starts[s], rates[s], route, jobs) for s, route in enumerate(routes))
+
+    initial_fuel = total_fuel()
+    if processes <= 1:
+        routes = _improve((starts, rates, cap_count, cap_weight, routes, jobs, deadline, seed))
+    else:
+        rng = random.Random(seed)
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(matrix,)) as pool:
+            for round_number in range(ROUNDS):
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                round_deadline = now + (deadline - now) / (ROUNDS - round_number)
+                order = list(range(len(ships)))
+                rng.shuffle(order)
+                groups = [order[i::processes] for i in range(processes)]
+                tasks = []
+                for group in groups:
+                    group_jobs = {j: jobs[j] for s in group for j in routes[s]}
+                    tasks.append(([starts[s] for s in group], [rates[s] for s in group],
+                                  [cap_count[s] for s in group], [cap_weight[s] for s in group],
+                                  [routes[s] for s in group], group_jobs, round_deadline, rng.random()))
+                for group, group_routes in zip(groups, pool.map(_improve, tasks)):
+                    for s, route in zip(group, group_routes):
+                        routes[s] = route
+
+    cargo_fuel = sum(matrix[trips[j][0]][trips[j][1]] * sum(c.consumption() for c in trips[j][2])
+                     for route in routes for j in route)
+    plan_routes = {}
+    for ship, route in zip(ships, routes):
+        if route:
+            plan_routes[ship.ship_id] = [Trip(port_ids[trips[j][0]], port_ids[trips[j][1]], trips[j][2])
+                                         for j in route]
+    return FleetPlan(
+        plan_routes,
+        total_fuel() + cargo_fuel,
+        initial_fuel + cargo_fuel,
+        cargo_fuel,
+        [container for j in unassigned for container in trips[j][2]],
+        time.perf_counter() - start_time,
+        max(processes, 1)
+    )
@@ -0,0 +1,50 @@
+_chains = {}  # (owner, attribute) -> (original, {tag: layer}) in the order the layers were added
+
+
+def _rebuild(owner, attribute):
+    original, layers = _chains[(owner, attribute)]
+    function = original
+    for layer in layers.values():
+        function = layer(function)
+    setattr(owner, attribute, function)
+
+
+def add(owner, attribute, tag, layer):
+    """
+    Wraps an attribute of a class or module with a layer.
+
+    Every layer of an attribute is kept apart from the original, so the layers can be
+    added and removed in any order: each change rebuilds the stack over the original,
+    with the layers nested in the order they were added (the first one innermost).
+
+    Args:
+        owner (object): The class or module holding the attribute.
+        attribute (str): The name of the attribute, e.g. a method name.
+        tag (str): The name of the layer; adding a layer under a tag already in use replaces it.
+        layer (callable): A function that takes the function below it and returns its wrapper.
+    """
+    key = (owner, attribute)
+    if key not in _chains:
+        _chains[key] = (getattr(owner, attribute), {})
+    _chains[key][1][tag] = layer
+    _rebuild(owner, attribute)
+
+
+def remove(owner, attribute, tag):
+    """
+    Removes a layer added with add(), keeping the other layers of the attribute.
+
+    Args:
+        owner (object): The class or module holding the attribute.
+        attribute (str): The name of the attribute.
+        tag (str): The name of the layer; an unknown tag is ignored.
+    """
+    key = (owner, attribute)
+    chain = _chains.get(key)
+    if chain is None or chain[1].pop(tag, None) is None:
+        return
+    if chain[1]:
+        _rebuild(owner, attribute)
+    else:
+        del _chains[key]
+        setattr(owner, attribute, chain[0])
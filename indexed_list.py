@@ -0,0 +1,143 @@
+from itertools import islice
+
+_MISSING = object()
+
+
+class IndexedList:
+    """
+    An insertion-ordered collection backed by a dict keyed by an ID of its items.
+
+    It offers the list operations the model uses (iteration, len, ``in``, append
+    and remove) but answers membership, append and remove in O(1) instead of
+    scanning. Each key can be held only once, which differs from a list: appending
+    an item whose key is already present, but which is a different object, replaces
+    the stored item in its current position, so the older object is dropped where
+    a list would have held both. For example, a ship object recreated with the
+    same ID that docks at a port evicts the old object from the port's ships.
+
+    Attributes:
+        key (callable): The function that returns the key of an item, e.g. its ID.
+    """
+
+    def __init__(self, key, items=()):
+        """
+        Initializes the collection.
+
+        Args:
+            key (callable): The function that returns the key of an item.
+            items (iterable): Items to add in order.
+        """
+        self.key = key
+        self._items = {}  # key -> item, in insertion order
+        self.extend(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __reversed__(self):
+        return reversed(self._items.values())
+
+    def __contains__(self, item):
+        stored = self._items.get(self.key(item), _MISSING)
+        return stored is not _MISSING and (stored is item or stored == item)
+
+    def __getitem__(self, index):
+        """
+        Returns the item at the given position, like list indexing.
+
+        This walks the collection and is O(n); it exists for compatibility only.
+
+        Args:
+            index (int): The position of the item; negative values count from the end.
+
+        Returns:
+            object: The item at the position.
+        """
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError("index out of range")
+        return next(islice(self._items.values(), index, None))
+
+    def __eq__(self, other):
+        if isinstance(other, IndexedList):
+            other = list(other)
+        return list(self._items.values()) == other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self._items.values())!r})"
+
+    def get(self, key, default=None):
+        """
+        Returns the item stored under a key.
+
+        Args:
+            key: The key of the item, e.g. its ID.
+            default: The value returned when no item has the key.
+
+        Returns:
+            object: The item, or the default.
+        """
+        return self._items.get(key, default)
+
+    def append(self, item):
+        """
+        Adds an item at the end, or replaces the stored item with the same key.
+
+        A replaced item keeps its position and is no longer held by the collection.
+
+        Args:
+            item: The item to add.
+        """
+        self._items[self.key(item)] = item
+
+    def extend(self, items):
+        """
+        Adds several items at the end.
+
+        Args:
+            items (iterable): The items to add.
+        """
+        for item in items:
+            self.append(item)
+
+    def remove(self, item):
+        """
+        Removes an item, like list.remove.
+
+        Args:
+            item: The item to remove.
+
+        Raises:
+            ValueError: If the item is not present.
+        """
+        if item not in self:
+            raise ValueError("item not in collection")
+        del self._items[self.key(item)]
+
+    def discard(self, item) -> bool:
+        """
+        Removes an item if it is present.
+
+        Args:
+            item: The item to remove.
+
+        Returns:
+            bool: True if the item was removed, False if it was not present.
+        """
+        if item not in self:
+            return False
+        del self._items[self.key(item)]
+        return True
+
+    def clear(self):
+        """
+        Removes all items.
+        """
+        self._items.clear()
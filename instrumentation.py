@@ -0,0 +1,297 @@
+import atexit
+import functools
+import inspect
+import json
+import signal
+import time
+from collections import Counter
+import hooks
+
+_HOOK_TAG = "instrumentation"  # The name of this module's layers in hooks
+
+
+class OperationStats:
+    """
+    Call count, wall time and latency histogram of one instrumented operation.
+
+    Latencies are bucketed by powers of two of microseconds: bucket b holds the
+    calls that took less than 2**b microseconds and at least 2**(b - 1).
+
+    Attributes:
+        calls (int): The number of calls.
+        total (float): The accumulated wall time in seconds.
+        min (float): The fastest call in seconds.
+        max (float): The slowest call in seconds.
+        histogram (Counter): The number of calls per latency bucket.
+    """
+
+    __slots__ = ('calls', 'total', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.histogram = Counter()
+
+    def record(self, elapsed):
+        """
+        Adds one call.
+
+        Args:
+            elapsed (float): The wall time of the call in seconds.
+        """
+        self.calls += 1
+        self.total += elapsed
+        if elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[int(elapsed * 1e6).bit_length()] += 1
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics as a JSON-ready dictionary.
+
+        Returns:
+            dict: The counts and times, with the histogram keyed by its upper bound in microseconds.
+        """
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.calls if self.calls else 0.0,
+            "min_seconds": self.min if self.calls else 0.0,
+            "max_seconds": self.max,
+            "histogram_us": {f"<{2 ** bucket}": count for bucket, count in sorted(self.histogram.items())}
+        }
+
+
+def _hot_paths():
+    # Imported here so that importing this module stays cheap when instrumentation is off
+    import port_report
+    from container import Container
+    from port import Port
+    from ship import Ship
+    from world_loader import WorldLoader
+    return {
+        "sail_to": (Ship, "sail_to"),
+        "refuel": (Ship, "refuel"),
+        "get_distance": (Port, "get_distance"),
+        "incoming_ship": (Port, "incoming_ship"),
+        "outgoing_ship": (Port, "outgoing_ship"),
+        "load_container": (Ship, "load_container"),
+        "unload_container": (Ship, "unload_container"),
+        "load_containers": (Ship, "load_containers"),
+        # iter_containers() and place_containers() both stream the input through it
+        "json_load": (WorldLoader, "iter_placements"),
+        "report": (port_report, "write_port_report"),
+    }, Container
+
+
+class Instrumentation:
+    """
+    Opt-in call counting and timing of the model's hot paths.
+
+    While disabled, nothing is wrapped and the hot paths run their original code,
+    so there is no overhead at all. enable() replaces the hot-path methods with
+    timing wrappers and counts created containers per type; disable() removes
+    them again. The wrappers are layers of the hooks module, so they can be enabled
+    and disabled in any order relative to an attached EventLog.
+
+    Attributes:
+        stats (dict): OperationStats keyed by operation name.
+        object_counts (Counter): The number of containers created per class name.
+        enabled (bool): Whether the wrappers are installed.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.object_counts = Counter()
+        self.enabled = False
+        self._hooked = []  # (owner, attribute) pairs wrapped by enable()
+
+    def _wrap(self, name, function):
+        stats = self.stats.setdefault(name, OperationStats())
+        clock = time.perf_counter
+
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                # A generator is timed over its whole iteration, as one call
+                start = clock()
+                try:
+                    yield from function(*args, **kwargs)
+                finally:
+                    stats.record(clock() - start)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    stats.record(clock() - start)
+        return wrapper
+
+    def enable(self):
+        """
+        Installs the timing wrappers and the container counter.
+        """
+        if self.enabled:
+            return
+        hot_paths, container_class = _hot_paths()
+        for name, (owner, attribute) in hot_paths.items():
+            hooks.add(owner, attribute, _HOOK_TAG, functools.partial(self._wrap, name))
+            self._hooked.append((owner, attribute))
+
+        counts = self.object_counts
+
+        def counting(original_init):
+            @functools.wraps(original_init)
+            def counting_init(container, *args, **kwargs):
+                counts[type(container).__name__] += 1
+                original_init(container, *args, **kwargs)
+            return counting_init
+        hooks.add(container_class, "__init__", _HOOK_TAG, counting)
+        self._hooked.append((container_class, "__init__"))
+        self.enabled = True
+
+    def disable(self):
+        """
+        Removes the wrappers; the collected statistics are kept.
+
+        Other layers on the same methods, such as an attached EventLog, stay in place.
+        """
+        for owner, attribute in self._hooked:
+            hooks.remove(owner, attribute, _HOOK_TAG)
+        self._hooked = []
+        self.enabled = False
+
+    def reset(self):
+        """
+        Clears the collected statistics.
+        """
+        for stats in self.stats.values():
+            stats.__init__()
+        self.object_counts.clear()
+
+    def summary(self) -> dict:
+        """
+        Returns the collected statistics.
+
+        Returns:
+            dict: The statistics per operation and the container counts per type.
+        """
+        return {
+            "operations": {name: stats.as_dict() for name, stats in self.stats.items() if stats.calls},
+            "containers_created": dict(self.object_counts)
+        }
+
+    def write_summary(self, path):
+        """
+        Writes the collected statistics as JSON.
+
+        Args:
+            path (str): The path of the file to write.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=4)
+
+
+instrumentation = Instrumentation()
+
+
+def enable(summary_path=None):
+    """
+    Enables the shared Instrumentation, optionally writing its summary when the process exits.
+
+    Args:
+        summary_path (str): The path of the JSON summary written at exit, or None.
+    """
+    instrumentation.enable()
+    if summary_path:
+        atexit.register(instrumentation.write_summary, summary_path)
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler that samples the Python stack on a CPU-time timer.
+
+    Samples are written in the collapsed-stack format ("outer;inner count" per
+    line) read by flame graph tools. Only available where signal.setitimer is
+    (Linux and other Unix systems) and only samples the main thread.
+
+    Attributes:
+        interval (float): The CPU time between samples in seconds.
+        samples (Counter): The number of samples per collapsed stack.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """
+        Starts sampling.
+        """
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """
+        Stops sampling.
+        """
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def dump(self, path):
+        """
+        Writes the samples in the collapsed-stack format.
+
+        Args:
+            path (str): The path of the file to write.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def start_profiler(path, mode="cprofile"):
+    """
+    Starts a profiler whose output is written to a file when the process exits.
+
+    Args:
+        path (str): The path of the profile to write.
+        mode (str): "cprofile" for a cProfile stats dump (readable with pstats),
+            or "sample" for collapsed stacks from the SamplingProfiler.
+
+    Returns:
+        object: The running cProfile.Profile or SamplingProfiler.
+    """
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def finish():
+            profiler.disable()
+            profiler.dump_stats(path)
+    elif mode == "sample":
+        profiler = SamplingProfiler()
+        profiler.start()
+
+        def finish():
+            profiler.stop()
+            profiler.dump(path)
+    else:
+        raise ValueError(f"Unknown profiler mode: {mode!r}")
+    atexit.register(finish)
+    return profiler
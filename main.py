@@ -1,151 +1,180 @@
-import json
-from port import Port
-from ship import Ship
-from container import BasicContainer, HeavyContainer, RefrigeratedContainer, LiquidContainer
+import sys
 
-def print_port_info(ports):
+# Measured startup budgets, enforced by `python main.py --mode check-startup`.
+# Import: the wall time `import main` adds to a bare interpreter start. Startup: the
+# wall time of a whole `python main.py` run on the bundled input.json, interpreter included.
+IMPORT_TIME_TARGET = 0.010
+STARTUP_TIME_TARGET = 0.100
+
+MODES = ("report", "summary", "convert", "check-startup")
+FORMATS = ("indented", "compact")
+WORLD_FILE_SUFFIX = ".pwld"
+
+
+def print_port_info(ports, out=None, compact=False):
     """
     Outputs information about the ports, including their containers and the ships docked at each port.
 
     Args:
         ports (dict): A dictionary of Port objects where the key is the port ID and the value is the Port instance.
+        out (file): A text stream to write to; defaults to standard output.
+        compact (bool): Whether to write compact, non-indented JSON for machine consumers.
 
     For each port, the function retrieves:
         - Latitude and longitude of the port.
         - Lists of containers categorized by type (basic, heavy, refrigerated, liquid).
         - Ships currently at the port, including details of their fuel and categorized containers on board.
 
-    The output is printed in a structured JSON format for easy readability.
+    The output is streamed port by port in a structured JSON format for easy readability.
+    """
+    # Imported on first use, and looked up on the module so that instrumentation can wrap it
+    import port_report
+    port_report.write_port_report(ports, out, compact)
+
+
+def load_world(path) -> tuple:
+    """
+    Loads the ports and ships of a world from a JSON input file or a binary world file.
+
+    Args:
+        path (str): The path of the input; files ending in WORLD_FILE_SUFFIX are read with world_file.
+
+    Returns:
+        tuple: Dicts of the ports and ships keyed by ID and the number of containers read.
     """
-    output = {}
-    for port_id, port in ports.items():
-        port_info = {
-            "lat": round(port.latitude, 2),
-            "lon": round(port.longitude, 2),
-            "basic_container": [],
-            "heavy_container": [],
-            "refrigerated_container": [],
-            "liquid_container": []
-        }
-
-        # Sort containers by type at the port
-        for container in port.containers:
-            if isinstance(container, BasicContainer):
-                port_info["basic_container"].append(container.container_id)
-            elif isinstance(container, RefrigeratedContainer):
-                port_info["refrigerated_container"].append(container.container_id)
-            elif isinstance(container, LiquidContainer):
-                port_info["liquid_container"].append(container.container_id)
-            elif isinstance(container, HeavyContainer):
-                port_info["heavy_container"].append(container.container_id)
-
-        # Sort container IDs in ascending order
-        port_info["basic_container"].sort()
-        port_info["heavy_container"].sort()
-        port_info["refrigerated_container"].sort()
-        port_info["liquid_container"].sort()
-
-        # Add information about ships currently docked at the port
-        for ship in port.current_ships:
-            ship_info = {
-                "fuel_left": round(ship.fuel, 2),
-                "basic_container": [],
-                "heavy_container": [],
-                "refrigerated_container": [],
-                "liquid_container": []
-            }
-
-            # Sort containers on each ship by type
-            for container in ship.containers:
-                if isinstance(container, BasicContainer):
-                    ship_info["basic_container"].append(container.container_id)
-                elif isinstance(container, RefrigeratedContainer):
-                    ship_info["refrigerated_container"].append(container.container_id)
-                elif isinstance(container, LiquidContainer):
-                    ship_info["liquid_container"].append(container.container_id)
-                elif isinstance(container, HeavyContainer):
-                    ship_info["heavy_container"].append(container.container_id)
-
-            # Sort container IDs on ships
-            ship_info["basic_container"].sort()
-            ship_info["heavy_container"].sort()
-            ship_info["refrigerated_container"].sort()
-            ship_info["liquid_container"].sort()
-
-            port_info[f"ship_{ship.ship_id}"] = ship_info
-
-        output[f"Port {port_id}"] = port_info
-
-    print(json.dumps(output, indent=4))
-
-
-def main():
+    if path.endswith(WORLD_FILE_SUFFIX):
+        from world_file import load_world as load_world_file
+        ports, ships, containers = load_world_file(path).materialize()
+        return ports, ships, len(containers)
+
+    from world_loader import WorldLoader
+    loader = WorldLoader(path)
+    # Containers go to their "port_id" or onto their "ship_id"; those with neither stay in port 1
+    count = loader.place_containers(default_port_id=1)
+    return loader.ports, loader.ships, count
+
+
+def _best_wall_time(command, runs) -> float:
+    import subprocess
+    import time
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_startup(runs=5) -> int:
     """
-    Main function that orchestrates the reading of input data, creation of port, ship, and container objects, 
+    Measures the import and startup times and compares them with their targets.
+
+    Each command is run `runs` times in a fresh interpreter and its fastest run is kept.
+
+    Args:
+        runs (int): The number of runs per measurement.
+
+    Returns:
+        int: 1 if a target is missed, 0 otherwise.
+    """
+    import os
+    directory = os.path.dirname(os.path.abspath(__file__))
+    bare = _best_wall_time([sys.executable, "-c", "pass"], runs)
+    imported = _best_wall_time([sys.executable, "-c", f"import sys; sys.path.insert(0, {directory!r}); import main"], runs)
+    startup = _best_wall_time([sys.executable, os.path.join(directory, "main.py"), os.path.join(directory, "input.json")], runs)
+    failed = 0
+    for name, seconds, target in (("import", imported - bare, IMPORT_TIME_TARGET),
+                                  ("startup", startup, STARTUP_TIME_TARGET)):
+        verdict = "ok" if seconds <= target else "TOO SLOW"
+        failed |= seconds > target
+        print(f"{name:8} {seconds * 1000:8.2f} ms  (target {target * 1000:.0f} ms)  {verdict}")
+    return int(failed)
+
+
+def main(argv=None):
+    """
+    Main function that orchestrates the reading of input data, creation of port, ship, and container objects,
     and prints the port information.
 
+    Args:
+        argv (list): The command-line arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit status.
+
     The function:
-    - Reads configuration data from 'input.json'.
+    - Streams configuration data from the input file (by default 'input.json') through WorldLoader,
+      or memory-maps a binary world file.
     - Creates instances of Port, Ship, and Container objects based on the input data.
-    - Adds containers to the ports and ships.
-    - Calls print_port_info() to output the structured information.
+    - Adds containers to the ports and ships given by their "port_id" and "ship_id" (port 1 by default).
+    - Depending on --mode, prints the port information, a one-line summary, or converts the input
+      to a binary world file. Only the modules the chosen mode needs are imported.
 
     Handles:
-    - FileNotFoundError if 'input.json' is not found.
+    - FileNotFoundError if the input file is not found.
     - JSONDecodeError if there's an issue with the syntax of the JSON input.
+    - ValueError if the input refers to unknown ports or ships or overloads a ship.
     """
+    import argparse
+    parser = argparse.ArgumentParser(description="Prints the ports, ships and containers of a world.")
+    parser.add_argument("input", nargs="?", default="input.json",
+                        help=f"JSON, JSON Lines or {WORLD_FILE_SUFFIX} world file, default input.json")
+    parser.add_argument("-o", "--output", help="write to this file instead of standard output")
+    parser.add_argument("--format", choices=FORMATS, default="indented", help="report layout, default indented")
+    parser.add_argument("--mode", choices=MODES, default="report",
+                        help="report (default), summary counts, convert to a world file, or check-startup")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="in report mode, serve the world from this many region shard processes")
+    parser.add_argument("--instrument", metavar="PATH",
+                        help="time the hot paths and write a JSON summary to PATH at exit")
+    parser.add_argument("--profile", metavar="PATH", help="write a profile of the whole run to PATH at exit")
+    parser.add_argument("--profile-mode", choices=("cprofile", "sample"), default="cprofile",
+                        help="cProfile stats or sampled collapsed stacks, default cprofile")
+    args = parser.parse_args(argv)
+    if args.mode == "convert" and not args.output:
+        parser.error("--mode convert needs --output")
+    if args.mode == "check-startup":
+        return check_startup()
+    if args.instrument or args.profile:
+        import instrumentation
+        if args.instrument:
+            instrumentation.enable(args.instrument)
+        if args.profile:
+            instrumentation.start_profiler(args.profile, args.profile_mode)
+
+    from json import JSONDecodeError
     try:
-        # Read configuration from the input JSON file
-        with open('input.json', 'r') as f:
-            data = json.load(f)
+        ports, ships, container_count = load_world(args.input)
     except FileNotFoundError:
-        print("Файл 'input.json' не знайдено. Будь ласка, перевірте його наявність.")
-        return
-    except json.JSONDecodeError:
+        print(f"Файл '{args.input}' не знайдено. Будь ласка, перевірте його наявність.")
+        return 1
+    except JSONDecodeError:
         print("Помилка в структурі JSON-файлу. Перевірте синтаксис.")
-        return
-
-    # Create port objects from the data
-    ports = {}
-    for port_data in data["ports"]:
-        port = Port(port_data["id"], port_data["latitude"], port_data["longitude"])
-        ports[port_data["id"]] = port
-
-    # Create ship objects from the data
-    ships = {}
-    for ship_data in data["ships"]:
-        port = ports[ship_data["current_port"]]
-        ship = Ship(
-            ship_data["id"],
-            ship_data["fuel"],
-            port,
-            ship_data["max_weight"],
-            ship_data["max_containers"],
-            ship_data["fuel_consumption_per_km"]
-        )
-        ships[ship_data["id"]] = ship
-        port.incoming_ship(ship)
-
-    # Create container objects from the data
-    containers = {}
-    for container_data in data["containers"]:
-        if container_data["type"] == "basic":
-            container = BasicContainer(container_data["id"], container_data["weight"])
-        elif container_data["type"] == "heavy":
-            container = HeavyContainer(container_data["id"], container_data["weight"])
-        elif container_data["type"] == "refrigerated":
-            container = RefrigeratedContainer(container_data["id"], container_data["weight"])
-        elif container_data["type"] == "liquid":
-            container = LiquidContainer(container_data["id"], container_data["weight"])
-        containers[container_data["id"]] = container
-
-    # For demonstration purposes, add containers to a specific port
-    for container in containers.values():
-        ports[1].containers.append(container)  # Example: all containers are in port 1
-
-    # Print port and ship information
-    print_port_info(ports)
+        return 1
+    except ValueError as error:
+        print(f"Помилка у вхідних даних: {error}")
+        return 1
+
+    if args.mode == "convert":
+        from world_file import save_world
+        save_world(args.output, ports, ships)
+        return 0
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.mode == "summary":
+            print(f"ports: {len(ports)}, ships: {len(ships)}, containers: {container_count}", file=out)
+        elif args.shards > 1:
+            from world_server import ShardedWorld
+            with ShardedWorld(ports, ships, args.shards) as world:
+                world.write_report(out, args.format == "compact")
+        else:
+            # Print port and ship information
+            print_port_info(ports, out, args.format == "compact")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,5 +1,10 @@
+from math import radians
+from operator import attrgetter
 from typing import TYPE_CHECKING
 from i_port import IPort
+from port_registry import haversine
+from fuel_consumption import batch_consumption
+from indexed_list import IndexedList
 
 if TYPE_CHECKING:
     from ship import Ship
@@ -14,8 +19,11 @@ class Port(IPort):
         latitude (float): The latitude of the port.
         longitude (float): The longitude of the port.
         containers (list): A list of containers currently stored at the port.
-        history (list): A list of ships that have docked at the port at any time.
-        current_ships (list): A list of ships currently docked at the port.
+        history (IndexedList): The ships that have docked at the port at any time, keyed by ship ID.
+        current_ships (IndexedList): The ships currently docked at the port, keyed by ship ID.
+        registry (PortRegistry): The registry the port belongs to, if any.
+        version (int): A counter increased on every change of the port or of a ship docked at it.
+        trackers (list): The ChangeTracker objects notified of every change.
     """
 
     def __init__(self, port_id, latitude, longitude):
@@ -28,11 +36,83 @@ class Port(IPort):
             longitude (float): The longitude coordinate of the port.
         """
         self.port_id = port_id
-        self.latitude = latitude
-        self.longitude = longitude
-        self.containers = []
-        self.history = []
-        self.current_ships = []
+        self._latitude = latitude
+        self._longitude = longitude
+        self._containers = []
+        self.history = IndexedList(attrgetter('ship_id'))
+        self.current_ships = IndexedList(attrgetter('ship_id'))
+        self.registry = None
+        self.version = 0
+        self.trackers = []
+
+    def mark_changed(self):
+        """
+        Records a change of the port and notifies its change trackers.
+
+        The port's own methods call this; code that mutates the containers list
+        directly must call it as well.
+        """
+        self.version += 1
+        for tracker in self.trackers:
+            tracker.mark(self)
+
+    @property
+    def containers(self):
+        return self._containers
+
+    @containers.setter
+    def containers(self, value):
+        self._containers = value
+        self.mark_changed()
+
+    def add_container(self, container):
+        """
+        Stores a container at the port.
+
+        Args:
+            container (Container): The container to store.
+        """
+        self._containers.append(container)
+        self.mark_changed()
+
+    def remove_container(self, container) -> bool:
+        """
+        Removes a container stored at the port.
+
+        Args:
+            container (Container): The container to remove.
+
+        Returns:
+            bool: True if the container was removed, False if it is not stored at the port.
+        """
+        try:
+            self._containers.remove(container)
+        except ValueError:
+            return False
+        self.mark_changed()
+        return True
+
+    @property
+    def latitude(self):
+        return self._latitude
+
+    @latitude.setter
+    def latitude(self, value):
+        self._latitude = value
+        if self.registry is not None:
+            self.registry.update(self)  # Keeps the coordinate arrays and distance cache in sync
+        self.mark_changed()
+
+    @property
+    def longitude(self):
+        return self._longitude
+
+    @longitude.setter
+    def longitude(self, value):
+        self._longitude = value
+        if self.registry is not None:
+            self.registry.update(self)
+        self.mark_changed()
 
     def incoming_ship(self, ship: 'Ship'):
         """
@@ -46,6 +126,7 @@ class Port(IPort):
         """
         if ship not in self.current_ships:
             self.current_ships.append(ship)
+            self.mark_changed()
         if ship not in self.history:
             self.history.append(ship)
 
@@ -60,6 +141,16 @@ class Port(IPort):
         """
         if ship in self.current_ships:
             self.current_ships.remove(ship)
+            self.mark_changed()
+
+    def fuel_demand(self) -> tuple:
+        """
+        Calculates the fuel consumption of the containers stored at the port.
+
+        Returns:
+            tuple: The total consumption and a dict of the consumption per container type.
+        """
+        return batch_consumption(self.containers)
 
     def get_distance(self, other_port: 'Port') -> float:
         """
@@ -73,13 +164,10 @@ class Port(IPort):
 
         The function uses the Haversine formula to compute the great-circle distance 
         between two points on the Earth’s surface given their latitude and longitude.
+        When both ports belong to the same PortRegistry, the precomputed radian
+        coordinates of the registry are used instead of converting them on every call.
         """
-        from math import radians, sin, cos, sqrt, atan2
-        R = 6371  # Radius of the Earth in kilometers
-        lat1, lon1 = radians(self.latitude), radians(self.longitude)
-        lat2, lon2 = radians(other_port.latitude), radians(other_port.longitude)
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c  # Distance in kilometers
+        if self.registry is not None and self.registry is other_port.registry:
+            return self.registry.distance(self, other_port)
+        return haversine(radians(self.latitude), radians(self.longitude),
+                         radians(other_port.latitude), radians(other_port.longitude))
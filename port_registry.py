@@ -0,0 +1,222 @@
+from array import array
+from math import radians, sin, cos, sqrt, atan2
+from typing import TYPE_CHECKING
+from distance_cache import DistanceCache
+
+if TYPE_CHECKING:
+    from port import Port
+
+EARTH_RADIUS_KM = 6371  # Radius of the Earth in kilometers
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Calculates the great-circle distance between two points given in radians.
+
+    Args:
+        lat1 (float): The latitude of the first point in radians.
+        lon1 (float): The longitude of the first point in radians.
+        lat2 (float): The latitude of the second point in radians.
+        lon2 (float): The longitude of the second point in radians.
+
+    Returns:
+        float: The distance in kilometers between the two points.
+    """
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+class PortRegistry:
+    """
+    A registry of ports that stores their coordinates as contiguous radian arrays
+    and computes distances between them in batches.
+
+    The arrays are plain ``array('d')`` buffers so rows of the distance matrix are
+    produced in a single tight pass without converting degrees or looking up
+    attributes on the Port objects.
+
+    A port belongs to at most one claiming registry, which it keeps up to date when
+    its coordinates change and which Port.get_distance() uses. A registry created
+    with claim=False only copies the coordinates of its ports, for private use such
+    as a route graph or a planner, and leaves the ports' own registry alone.
+
+    Attributes:
+        ports (list): The registered ports in registration order.
+        cache (DistanceCache): The LRU cache of pairwise distances served by distance().
+        claim (bool): Whether registered ports are bound to this registry.
+    """
+
+    def __init__(self, ports=(), cache_size=4096, claim=True):
+        """
+        Initializes the registry and registers the given ports.
+
+        Args:
+            ports (iterable): Port objects to register.
+            cache_size (int): The maximum number of port pairs kept in the distance cache.
+            claim (bool): Whether to bind the ports to this registry; if False, the stored
+                coordinates are a copy that only update() refreshes.
+        """
+        self.ports = []
+        self.claim = claim
+        self.cache = DistanceCache(cache_size)
+        self._rows = {}  # port_id -> row in the coordinate arrays
+        self._lat = array('d')
+        self._lon = array('d')
+        self._cos_lat = array('d')
+        for port in ports:
+            self.add(port)
+
+    def __len__(self):
+        return len(self.ports)
+
+    def __iter__(self):
+        return iter(self.ports)
+
+    def __contains__(self, port):
+        row = self._rows.get(port.port_id)
+        return row is not None and self.ports[row] is port
+
+    def __getitem__(self, port_id):
+        """
+        Returns the registered port with the given ID.
+
+        Args:
+            port_id (int): The unique identifier of the port.
+
+        Returns:
+            Port: The registered port.
+        """
+        return self.ports[self._rows[port_id]]
+
+    def add(self, port: 'Port'):
+        """
+        Registers a port, or refreshes its coordinates if it is already registered.
+
+        Args:
+            port (Port): The port to register.
+
+        Raises:
+            ValueError: If this registry claims its ports and the port already belongs to another registry.
+        """
+        if self.claim and port.registry is not None and port.registry is not self:
+            raise ValueError(f"Port {port.port_id} already belongs to another registry")
+        row = self._rows.get(port.port_id)
+        if row is not None:
+            self.ports[row] = port
+            self.update(port)
+        else:
+            lat = radians(port.latitude)
+            self._rows[port.port_id] = len(self.ports)
+            self.ports.append(port)
+            self._lat.append(lat)
+            self._lon.append(radians(port.longitude))
+            self._cos_lat.append(cos(lat))
+        if self.claim:
+            port.registry = self
+
+    def update(self, port: 'Port'):
+        """
+        Refreshes the stored coordinates of an already registered port and drops
+        its cached distances.
+
+        Args:
+            port (Port): The port whose latitude or longitude has changed.
+        """
+        row = self._rows[port.port_id]
+        lat = radians(port.latitude)
+        self._lat[row] = lat
+        self._lon[row] = radians(port.longitude)
+        self._cos_lat[row] = cos(lat)
+        self.cache.invalidate(port.port_id)
+
+    def row_of(self, port: 'Port') -> int:
+        """
+        Returns the position of the port in the coordinate arrays.
+
+        Args:
+            port (Port): A registered port.
+
+        Returns:
+            int: The row of the port in the distance matrix.
+        """
+        return self._rows[port.port_id]
+
+    def distance(self, port: 'Port', other_port: 'Port') -> float:
+        """
+        Returns the distance between two registered ports, using the cache when possible.
+
+        Args:
+            port (Port): The first port.
+            other_port (Port): The second port.
+
+        Returns:
+            float: The distance in kilometers between the two ports.
+        """
+        distance = self.cache.get(port.port_id, other_port.port_id)
+        if distance is None:
+            distance = self.row_distance(self._rows[port.port_id], self._rows[other_port.port_id])
+            self.cache.put(port.port_id, other_port.port_id, distance)
+        return distance
+
+    def row_distance(self, i, j) -> float:
+        """
+        Calculates the distance between the ports in two rows, bypassing the cache.
+
+        Args:
+            i (int): The row of the first port.
+            j (int): The row of the second port.
+
+        Returns:
+            float: The distance in kilometers between the two ports.
+        """
+        dlat = self._lat[j] - self._lat[i]
+        dlon = self._lon[j] - self._lon[i]
+        a = sin(dlat / 2) ** 2 + self._cos_lat[i] * self._cos_lat[j] * sin(dlon / 2) ** 2
+        return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+    def distance_row(self, port: 'Port', start=0, stop=None) -> array:
+        """
+        Calculates the distances from one port to a range of registered ports.
+
+        Args:
+            port (Port): The port the distances are measured from.
+            start (int): The first row of the range.
+            stop (int): The row after the last one of the range, or None for all remaining rows.
+
+        Returns:
+            array: The distances in kilometers, one per port in registration order.
+        """
+        i = self._rows[port.port_id]
+        lat1, lon1, cos1 = self._lat[i], self._lon[i], self._cos_lat[i]
+        if stop is None:
+            stop = len(self.ports)
+        row = array('d', bytes(8 * max(stop - start, 0)))
+        lats, lons, coss = self._lat, self._lon, self._cos_lat
+        scale = EARTH_RADIUS_KM * 2
+        for k, j in enumerate(range(start, stop)):
+            a = sin((lats[j] - lat1) / 2) ** 2 + cos1 * coss[j] * sin((lons[j] - lon1) / 2) ** 2
+            row[k] = scale * atan2(sqrt(a), sqrt(1 - a))
+        return row
+
+    def distance_matrix(self) -> list:
+        """
+        Calculates the full matrix of distances between all registered ports.
+
+        Only the upper triangle is computed; the lower one is mirrored from it.
+
+        Returns:
+            list: A list of ``array('d')`` rows in registration order, where
+            ``matrix[i][j]`` is the distance in kilometers between ports i and j.
+        """
+        n = len(self.ports)
+        matrix = [array('d', bytes(8 * n)) for _ in range(n)]
+        for i, port in enumerate(self.ports):
+            upper = self.distance_row(port, i + 1)
+            row = matrix[i]
+            for k, value in enumerate(upper, i + 1):
+                row[k] = value
+                matrix[k][i] = value
+        return matrix
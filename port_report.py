@@ -0,0 +1,239 @@
+import json
+import sys
+from container import CONTAINER_TYPES, container_type_name
+from container_store import ContainerStore
+from change_tracking import ChangeTracker
+
+# Report key of each container type, in the order the keys appear in the report
+CONTAINER_KEYS = {type_name: f"{type_name}_container" for type_name in CONTAINER_TYPES}
+
+_KEYS_BY_CODE = list(CONTAINER_KEYS.values())
+_COMPACT_SEPARATORS = (',', ':')
+
+
+def bucket_container_ids(containers) -> dict:
+    """
+    Groups container IDs by container type and sorts each group once.
+
+    The type of every container is resolved with a single class lookup instead of
+    a chain of isinstance checks; a ContainerStore is bucketed straight from its
+    type code column. Containers of no registered type are left out.
+
+    Args:
+        containers (iterable): The containers, or a ContainerStore.
+
+    Returns:
+        dict: Sorted lists of container IDs keyed by report key (e.g. "basic_container").
+    """
+    buckets = {key: [] for key in CONTAINER_KEYS.values()}
+    if isinstance(containers, ContainerStore):
+        lists = [buckets[key] for key in _KEYS_BY_CODE]
+        for code, container_id in zip(containers.codes, containers.ids):
+            lists[code].append(container_id)
+    else:
+        for container in containers:
+            type_name = container_type_name(container)
+            if type_name is not None:
+                buckets[CONTAINER_KEYS[type_name]].append(container.container_id)
+    for ids in buckets.values():
+        ids.sort()
+    return buckets
+
+
+def port_section(port) -> dict:
+    """
+    Builds the report section of one port.
+
+    Args:
+        port (Port): The port to describe.
+
+    Returns:
+        dict: The coordinates of the port, its containers grouped by type and one
+        entry per docked ship with its fuel and containers grouped by type.
+    """
+    section = {"lat": round(port.latitude, 2), "lon": round(port.longitude, 2)}
+    section.update(bucket_container_ids(port.containers))
+    for ship in port.current_ships:
+        ship_info = {"fuel_left": round(ship.fuel, 2)}
+        ship_info.update(bucket_container_ids(ship.containers))
+        section[f"ship_{ship.ship_id}"] = ship_info
+    return section
+
+
+def render_section(port_id, section, compact=False) -> str:
+    """
+    Serializes one port section as a member of the report object.
+
+    Args:
+        port_id (int): The ID of the port.
+        section (dict): The section built by port_section().
+        compact (bool): Whether to produce the compact, non-indented form.
+
+    Returns:
+        str: The "Port <id>": {...} member, indented as it appears inside the report.
+    """
+    key = json.dumps(f"Port {port_id}")
+    if compact:
+        return key + ":" + json.dumps(section, separators=_COMPACT_SEPARATORS)
+    # Nested levels are indented one step deeper than in a standalone dump
+    body = json.dumps(section, indent=4).replace("\n", "\n    ")
+    return "    " + key + ": " + body
+
+
+def write_port_report(ports, out=None, compact=False):
+    """
+    Writes the report of all ports, one port at a time.
+
+    Only the section of the current port is held in memory. In the default
+    indented mode the output is identical to ``print(json.dumps(report, indent=4))``;
+    the compact mode writes the same document without whitespace.
+
+    Args:
+        ports (dict): A dictionary of Port objects keyed by port ID.
+        out (file): A text stream to write to; defaults to sys.stdout.
+        compact (bool): Whether to write the compact, non-indented form.
+    """
+    write_sections((render_section(port_id, port_section(port), compact) for port_id, port in ports.items()),
+                   out, compact)
+
+
+def write_sections(sections, out=None, compact=False):
+    """
+    Writes port sections rendered by render_section() as the report document.
+
+    Args:
+        sections (iterable): The rendered sections, in report order.
+        out (file): A text stream to write to; defaults to sys.stdout.
+        compact (bool): Whether the sections were rendered in the compact form.
+    """
+    if out is None:
+        out = sys.stdout
+    separator, opening, closing = _frame(compact)
+    first = True
+    for rendered in sections:
+        out.write(opening if first else separator)
+        first = False
+        out.write(rendered)
+    out.write("{}\n" if first else closing)
+
+
+def _frame(compact):
+    # The separator between sections and the text before and after them
+    return (",", "{", "}\n") if compact else (",\n", "{\n", "\n}\n")
+
+
+class IncrementalPortReport:
+    """
+    A port report that is refreshed by re-serializing only the ports that changed.
+
+    The report keeps the rendered section of every port. A ChangeTracker watching
+    the ports collects those that changed (see Port.mark_changed()), and refresh()
+    renders just their sections again and splices them into the cached document,
+    so its cost follows the number of changes rather than the size of the world.
+    Ports must be added, replaced and removed through add_port() and remove_port(),
+    since refresh() only looks at the changes of the ports it watches.
+
+    Attributes:
+        ports (dict): The ports keyed by port ID.
+        compact (bool): Whether the report uses the compact, non-indented form.
+    """
+
+    def __init__(self, ports, compact=False):
+        """
+        Initializes the report and renders every port once.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            compact (bool): Whether to produce the compact, non-indented form.
+        """
+        self.ports = ports
+        self.compact = compact
+        self._tracker = ChangeTracker()
+        self._sections = {}  # port_id -> rendered section
+        self._port_ids = {}  # id(port) -> port_id
+        for port_id, port in ports.items():
+            self._watch(port_id, port)
+
+    def _render(self, port_id, port):
+        self._sections[port_id] = render_section(port_id, port_section(port), self.compact)
+
+    def _watch(self, port_id, port):
+        self._tracker.watch(port)
+        self._port_ids[id(port)] = port_id
+        self._render(port_id, port)
+
+    def _unwatch(self, port):
+        self._tracker.unwatch(port)
+        self._port_ids.pop(id(port), None)
+
+    def add_port(self, port_id, port):
+        """
+        Adds a port to the ports dict and renders its section.
+
+        A port already stored under the ID is replaced, keeping its place in the report.
+
+        Args:
+            port_id (int): The ID to store the port under.
+            port (Port): The port to add.
+        """
+        previous = self.ports.get(port_id)
+        if previous is not None and previous is not port:
+            self._unwatch(previous)
+        self.ports[port_id] = port
+        self._watch(port_id, port)
+
+    def remove_port(self, port_id):
+        """
+        Removes a port from the ports dict and drops its section.
+
+        Args:
+            port_id (int): The ID of the port to remove.
+
+        Raises:
+            KeyError: If no port is stored under the ID.
+        """
+        self._unwatch(self.ports.pop(port_id))
+        del self._sections[port_id]
+
+    def refresh(self) -> int:
+        """
+        Re-renders the sections of the ports that changed since the last refresh.
+
+        Returns:
+            int: The number of sections rendered again.
+        """
+        rendered = 0
+        for port in self._tracker.drain():
+            port_id = self._port_ids.get(id(port))
+            if port_id is not None and self.ports.get(port_id) is port:
+                self._render(port_id, port)
+                rendered += 1
+        return rendered
+
+    def render(self) -> str:
+        """
+        Returns the cached report document.
+
+        Returns:
+            str: The same text write_port_report() writes for the ports, as of the last refresh.
+        """
+        if not self._sections:
+            return "{}\n"
+        separator, opening, closing = _frame(self.compact)
+        return opening + separator.join(self._sections.values()) + closing
+
+    def write(self, out=None):
+        """
+        Writes the cached report document.
+
+        Args:
+            out (file): A text stream to write to; defaults to sys.stdout.
+        """
+        (out or sys.stdout).write(self.render())
+
+    def close(self):
+        """
+        Stops tracking the changes of the ports.
+        """
+        for port in self.ports.values():
+            self._tracker.unwatch(port)
@@ -0,0 +1,305 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+from port_report import port_section
+
+ARRIVE = "arrive"
+DEPART = "depart"
+LOAD = "load"
+UNLOAD = "unload"
+EVENT_KINDS = (ARRIVE, DEPART, LOAD, UNLOAD)
+
+
+class PortEvent:
+    """
+    A state change submitted to a PortService.
+
+    Attributes:
+        kind (str): One of EVENT_KINDS.
+        port_id (int): The ID of the port whose queue handles the event.
+        ship_id (int): The ID of the ship involved.
+        container_id (int): The ID of the container for load and unload events.
+        submitted (float): The perf_counter() time the event was submitted.
+        future (asyncio.Future): Resolved with the result of the mutation.
+    """
+
+    __slots__ = ('kind', 'port_id', 'ship_id', 'container_id', 'submitted', 'future')
+
+    def __init__(self, kind, port_id, ship_id, container_id, future):
+        self.kind = kind
+        self.port_id = port_id
+        self.ship_id = ship_id
+        self.container_id = container_id
+        self.submitted = time.perf_counter()
+        self.future = future
+
+
+class PortService:
+    """
+    An asyncio front end that applies live port and ship events.
+
+    Every port has its own bounded event queue and worker task. A worker takes
+    whatever has queued up (up to batch_size events) as one batch and applies its
+    events one at a time, in order, through Port.incoming_ship(), Port.outgoing_ship(),
+    Ship.load_container() and Ship.unload_container(); events are not merged, so a
+    batch saves worker wake-ups and snapshot rebuilds, not mutations. The port's
+    snapshot is marked stale once per batch. Submitters wait when a queue is full,
+    which applies backpressure. Snapshots are rebuilt at most once per batch, on the
+    first read after it, and reading one never waits for queued events.
+
+    An event that raises is counted in failed and its future holds the error; the
+    error is marked as retrieved, so events submitted without waiting can fail
+    without asyncio logging an unretrieved exception.
+
+    Load and unload events are routed by the port_id they are submitted with, which
+    should be the port the ship is docked at.
+
+    Attributes:
+        ports (dict): The ports keyed by port ID.
+        ships (dict): The ships keyed by ship ID.
+        containers (dict): The containers keyed by container ID.
+        queue_size (int): The capacity of each port's event queue.
+        batch_size (int): The largest number of events applied in one batch.
+        latencies (deque): The submit-to-apply latencies of recent events, in seconds.
+        applied (int): The number of events applied without an error so far.
+        failed (int): The number of events that raised an error so far.
+        batches (int): The number of batches applied so far.
+    """
+
+    def __init__(self, ports, ships, containers=None, queue_size=1024, batch_size=256, latency_window=100000):
+        """
+        Initializes the service; call start() from a running event loop before submitting.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID.
+            containers (dict): The containers keyed by container ID.
+            queue_size (int): The capacity of each port's event queue.
+            batch_size (int): The largest number of events applied in one batch.
+            latency_window (int): The number of recent latencies kept for percentiles.
+        """
+        self.ports = ports
+        self.ships = ships
+        self.containers = containers or {}
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.latencies = deque(maxlen=latency_window)
+        self.applied = 0
+        self.failed = 0
+        self.batches = 0
+        self._queues = {}
+        self._workers = []
+        self._snapshots = {}
+        self._stale = set()  # IDs of ports changed since their snapshot was built
+
+    def start(self):
+        """
+        Creates the port queues and worker tasks.
+        """
+        for port_id in self.ports:
+            self._queues[port_id] = asyncio.Queue(self.queue_size)
+            self._stale.add(port_id)
+            self._workers.append(asyncio.create_task(self._worker(port_id)))
+
+    async def stop(self):
+        """
+        Waits until every queued event is applied, then stops the workers.
+        """
+        for queue in self._queues.values():
+            await queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, kind, port_id, ship_id, container_id=None, wait=True):
+        """
+        Submits an event, waiting for room in the port's queue.
+
+        Args:
+            kind (str): One of EVENT_KINDS.
+            port_id (int): The ID of the port whose queue handles the event.
+            ship_id (int): The ID of the ship involved.
+            container_id (int): The ID of the container for load and unload events.
+            wait (bool): Whether to wait until the event has been applied.
+
+        Returns:
+            bool: The result of the mutation if wait is set (False for a failed load
+            or unload), otherwise the future that will hold it.
+        """
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {kind!r}")
+        event = PortEvent(kind, port_id, ship_id, container_id, asyncio.get_running_loop().create_future())
+        await self._queues[port_id].put(event)
+        return await event.future if wait else event.future
+
+    def snapshot(self, port_id) -> dict:
+        """
+        Returns the state of a port after its last applied batch, without waiting for queued events.
+
+        Args:
+            port_id (int): The ID of the port.
+
+        Returns:
+            dict: The port's report section (see port_report.port_section()).
+        """
+        if port_id in self._stale or port_id not in self._snapshots:
+            self._snapshots[port_id] = port_section(self.ports[port_id])
+            self._stale.discard(port_id)
+        return self._snapshots[port_id]
+
+    async def _worker(self, port_id):
+        queue = self._queues[port_id]
+        port = self.ports[port_id]
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                self._apply_batch(port, batch)
+            finally:
+                self._stale.add(port_id)
+                for _ in batch:
+                    queue.task_done()
+
+    def _apply_batch(self, port, batch):
+        clock = time.perf_counter
+        for event in batch:
+            try:
+                ship = self.ships[event.ship_id]
+                if event.kind == ARRIVE:
+                    port.incoming_ship(ship)
+                    result = True
+                elif event.kind == DEPART:
+                    port.outgoing_ship(ship)
+                    result = True
+                elif event.kind == LOAD:
+                    result = ship.load_container(self.containers[event.container_id])
+                else:
+                    result = ship.unload_container(self.containers[event.container_id])
+            except Exception as error:
+                self.failed += 1
+                if not event.future.done():
+                    event.future.set_exception(error)
+                    event.future.exception()  # Retrieved here, as no one may wait for the event
+                continue
+            self.applied += 1
+            if not event.future.done():
+                event.future.set_result(result)
+            self.latencies.append(clock() - event.submitted)  # Stamped once this event is applied
+        self.batches += 1
+
+    def latency_percentile(self, percentile) -> float:
+        """
+        Returns a percentile of the recent submit-to-apply latencies.
+
+        Args:
+            percentile (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The latency in seconds, or 0.0 if no event has been applied.
+        """
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+async def generate_load(service, events, producers=64, seed=0, rate=None) -> dict:
+    """
+    Drives a running PortService with random events and snapshot reads, and measures it.
+
+    Producers yield to the event loop after every submit, so their events interleave
+    with the workers and readers instead of arriving as one burst per producer. With
+    a rate, they also keep to a schedule, which measures latency under a steady load
+    rather than the time a backlog takes to drain.
+
+    Args:
+        service (PortService): The started service.
+        events (int): The total number of events to submit, spread over the producers.
+        producers (int): The number of concurrent producer tasks.
+        seed (int): The seed of the random event mix.
+        rate (float): The target number of events per second over all producers, or None for no pacing.
+
+    Returns:
+        dict: The event count, failed event count, elapsed time, events per second,
+        batch count, snapshot reads and p50/p99 latencies in milliseconds.
+    """
+    rng = random.Random(seed)
+    port_ids = list(service.ports)
+    ship_ids = list(service.ships)
+    container_ids = list(service.containers)
+    interval = producers / rate if rate else 0.0  # Seconds between two events of one producer
+
+    async def producer(count):
+        next_time = time.perf_counter()
+        for _ in range(count):
+            kind = rng.choice(EVENT_KINDS if container_ids else (ARRIVE, DEPART))
+            container_id = rng.choice(container_ids) if kind in (LOAD, UNLOAD) else None
+            await service.submit(kind, rng.choice(port_ids), rng.choice(ship_ids), container_id, wait=False)
+            next_time += interval
+            await asyncio.sleep(max(0.0, next_time - time.perf_counter()))
+
+    reads = 0
+    done = asyncio.Event()
+
+    async def reader():
+        nonlocal reads
+        while not done.is_set():
+            service.snapshot(rng.choice(port_ids))
+            reads += 1
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    reader_task = asyncio.create_task(reader())
+    await asyncio.gather(*(producer(events // producers + (index < events % producers))
+                           for index in range(producers)))
+    await service.stop()
+    done.set()
+    await reader_task
+    elapsed = time.perf_counter() - start
+    return {
+        "events": events,
+        "failed": service.failed,
+        "elapsed": elapsed,
+        "events_per_second": events / elapsed if elapsed > 0 else float('inf'),
+        "batches": service.batches,
+        "snapshot_reads": reads,
+        "p50_ms": service.latency_percentile(50) * 1000,
+        "p99_ms": service.latency_percentile(99) * 1000
+    }
+
+
+async def _demo(args):
+    from port import Port
+    from ship import Ship
+    from container import CONTAINER_TYPES
+
+    rng = random.Random(args.seed)
+    ports = {i: Port(i, rng.uniform(-60, 60), rng.uniform(-180, 180)) for i in range(1, args.ports + 1)}
+    ships = {}
+    for i in range(1, args.ships + 1):
+        port = ports[rng.randint(1, args.ports)]
+        ships[i] = Ship(i, 1000.0, port, 1e9, 1000, 1.0)
+        port.incoming_ship(ships[i])
+    container_types = list(CONTAINER_TYPES.values())
+    containers = {i: rng.choice(container_types)(i, rng.uniform(1, 30)) for i in range(1, args.containers + 1)}
+    service = PortService(ports, ships, containers, args.queue_size, args.batch_size)
+    service.start()
+    print(await generate_load(service, args.events, args.producers, args.seed, args.rate))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local load generator for PortService.")
+    parser.add_argument("--ports", type=int, default=100)
+    parser.add_argument("--ships", type=int, default=1000)
+    parser.add_argument("--containers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--producers", type=int, default=64)
+    parser.add_argument("--rate", type=float, help="target events per second, default unpaced")
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_demo(parser.parse_args()))
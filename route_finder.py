@@ -0,0 +1,183 @@
+import heapq
+from typing import TYPE_CHECKING
+from port_registry import PortRegistry
+from spatial_index import PortSpatialIndex
+
+if TYPE_CHECKING:
+    from port import Port
+    from ship import Ship
+
+
+class Route:
+    """
+    A multi-hop voyage found by PortGraph.find_route().
+
+    Attributes:
+        ports (list): The ports visited, from the start port to the destination.
+        distance (float): The total distance of the voyage in kilometers.
+        fuel_used (float): The total fuel burned on the voyage.
+        refuel_stops (list): The intermediate ports where the ship fills its tank.
+        capacity (float): The fuel level the ship is refuelled to at a refuel stop.
+    """
+
+    def __init__(self, ports, distance, fuel_used, refuel_stops, capacity):
+        self.ports = ports
+        self.distance = distance
+        self.fuel_used = fuel_used
+        self.refuel_stops = refuel_stops
+        self.capacity = capacity
+
+    def __repr__(self):
+        return (f"Route({[port.port_id for port in self.ports]}, distance={self.distance:.2f}, "
+                f"refuel_stops={[port.port_id for port in self.refuel_stops]})")
+
+    def follow(self, ship: 'Ship') -> bool:
+        """
+        Sails the ship along the route with Ship.sail_to(), refuelling at the refuel stops.
+
+        Args:
+            ship (Ship): The ship to move; it must be at the first port of the route.
+
+        Returns:
+            bool: True if the ship reached the destination, False if a hop failed.
+        """
+        refuel_stops = {id(port) for port in self.refuel_stops}
+        for port in self.ports[1:]:
+            if not ship.sail_to(port):
+                return False
+            if id(port) in refuel_stops and ship.fuel < self.capacity:
+                ship.refuel(self.capacity - ship.fuel)
+        return True
+
+
+class PortGraph:
+    """
+    A reusable graph of ports whose edges are weighted by great-circle distance.
+
+    By default every pair of ports is connected and the edges of a port are
+    produced on demand as one batched distance row. With k_nearest set, each port
+    is only connected to its k nearest ports (and to every port that has it among
+    its k nearest), which is precomputed once with a PortSpatialIndex and makes
+    queries on large graphs fast.
+
+    Edges are computed from the coordinates at construction time; rebuild the
+    graph after moving ports.
+
+    Attributes:
+        registry (PortRegistry): The registry holding the coordinates of the graph's ports.
+        k_nearest (int): The number of nearest neighbours kept per port, or None for a complete graph.
+    """
+
+    def __init__(self, ports, k_nearest=None):
+        """
+        Initializes the graph.
+
+        Args:
+            ports (iterable): The ports of the graph. If they are exactly the ports of
+                one PortRegistry, it is used; otherwise the graph keeps a private,
+                non-claiming registry of their coordinates.
+            k_nearest (int): The number of nearest neighbours kept per port, or None for a complete graph.
+        """
+        ports = list(ports)
+        registry = ports[0].registry if ports else None
+        if registry is None or len(registry) != len(ports) or any(port not in registry for port in ports):
+            registry = PortRegistry(ports, claim=False)
+        self.registry = registry
+        self.k_nearest = k_nearest
+        self._edges = self._nearest_edges(k_nearest) if k_nearest is not None else None
+
+    def _nearest_edges(self, k):
+        registry = self.registry
+        index = PortSpatialIndex(registry.ports)
+        edges = [dict() for _ in registry.ports]
+        for i, port in enumerate(registry.ports):
+            for _, neighbour in index.nearest_ports(port, k):
+                j = registry.row_of(neighbour)
+                # Edge weights use the same formula as Port.get_distance()
+                edges[i][j] = edges[j][i] = registry.row_distance(i, j)
+        return [list(port_edges.items()) for port_edges in edges]
+
+    def neighbours(self, row):
+        """
+        Returns the edges of the port in the given registry row.
+
+        Args:
+            row (int): The row of the port in the registry.
+
+        Returns:
+            iterable: Pairs of (neighbour row, distance in kilometers).
+        """
+        if self._edges is not None:
+            return self._edges[row]
+        return ((j, distance) for j, distance in enumerate(self.registry.distance_row(self.registry.ports[row]))
+                if j != row)
+
+    def find_route(self, ship: 'Ship', destination: 'Port', refuel_ports=None, capacity=None):
+        """
+        Finds the shortest voyage from the ship's current port that the ship can make on its fuel.
+
+        The search is A* with the great-circle distance to the destination as the
+        heuristic, over states of (port, fuel left). A hop is feasible when the
+        fuel on board covers ``distance * ship.fuel_consumption_per_km``, the same
+        rule as Ship.sail_to(). At refuel ports the ship fills up to the capacity.
+
+        Args:
+            ship (Ship): The ship that makes the voyage.
+            destination (Port): The port to reach.
+            refuel_ports (iterable): IDs of the ports where the ship may refuel, or True for every port.
+            capacity (float): The fuel level reached when refuelling; defaults to the ship's current fuel.
+
+        Returns:
+            Route: The shortest feasible route, or None if the destination cannot be reached.
+        """
+        registry = self.registry
+        ports = registry.ports
+        rate = ship.fuel_consumption_per_km
+        capacity = ship.fuel if capacity is None else capacity
+        if refuel_ports is True:
+            refuelling = [True] * len(ports)
+        else:
+            refuel_ids = set(refuel_ports or ())
+            refuelling = [port.port_id in refuel_ids for port in ports]
+        start = registry.row_of(ship.current_port)
+        goal = registry.row_of(destination)
+        heuristic = registry.distance_row(destination)  # One batched pass per query
+
+        labels = [(start, ship.fuel, None, 0.0, False)]  # (row, fuel, parent label, distance, refuelled)
+        best_fuel = {}  # row -> most fuel seen when the row was expanded
+        queue = [(heuristic[start], 0.0, 0)]
+        while queue:
+            _, distance, label = heapq.heappop(queue)
+            row, fuel = labels[label][0], labels[label][1]
+            if row == goal:
+                return self._route(labels, label, rate, capacity)
+            if best_fuel.get(row, -1.0) >= fuel:
+                continue  # An earlier, no longer state reached this port with at least as much fuel
+            best_fuel[row] = fuel
+            for neighbour, edge in self.neighbours(row):
+                fuel_left = fuel - edge * rate
+                if fuel_left < 0:
+                    continue
+                refuelled = refuelling[neighbour] and neighbour != goal and fuel_left < capacity
+                if refuelled:
+                    fuel_left = capacity
+                if best_fuel.get(neighbour, -1.0) >= fuel_left:
+                    continue
+                labels.append((neighbour, fuel_left, label, distance + edge, refuelled))
+                heapq.heappush(queue, (distance + edge + heuristic[neighbour], distance + edge, len(labels) - 1))
+        return None
+
+    def _route(self, labels, label, rate, capacity):
+        ports = self.registry.ports
+        path = []
+        refuel_stops = []
+        distance = labels[label][3]
+        while label is not None:
+            row, _, parent, _, refuelled = labels[label]
+            path.append(ports[row])
+            if refuelled:
+                refuel_stops.append(ports[row])
+            label = parent
+        path.reverse()
+        refuel_stops.reverse()
+        return Route(path, distance, distance * rate, refuel_stops, capacity)
@@ -0,0 +1,177 @@
+from operator import attrgetter
+from container import CONTAINER_TYPES, Container, container_type_name
+
+
+def longitude_regions(ports, shards) -> dict:
+    """
+    Splits ports into regions of equal size by longitude.
+
+    Args:
+        ports (dict): The ports keyed by port ID.
+        shards (int): The number of regions.
+
+    Returns:
+        dict: The region index of each port, keyed by port ID.
+    """
+    ordered = sorted(ports.values(), key=attrgetter('longitude'))
+    size = -(-len(ordered) // shards) or 1
+    return {port.port_id: index // size for index, port in enumerate(ordered)}
+
+
+def copy_container(container):
+    """
+    Copies a container into a plain container of the same type, ID and weight.
+
+    Args:
+        container (Container): The container, possibly a ContainerStore view.
+
+    Returns:
+        Container: The copy, which can be sent to another process.
+    """
+    type_name = container_type_name(container)
+    container_class = CONTAINER_TYPES[type_name] if type_name is not None else Container
+    return container_class(container.container_id, container.weight)
+
+
+def copy_ship(ship):
+    """
+    Copies a ship and its load into an undocked ship.
+
+    The running totals of the load are copied as they are, so the copy matches the ship exactly.
+
+    Args:
+        ship (Ship): The ship.
+
+    Returns:
+        Ship: The copy, whose current_port is None, so that it can be sent to another process alone.
+    """
+    from ship import Ship
+    copy = Ship(ship.ship_id, ship.fuel, None, ship.max_weight, ship.max_containers, ship.fuel_consumption_per_km)
+    copy.restore_containers((copy_container(container) for container in ship.containers), totals_from=ship)
+    return copy
+
+
+def port_record(port, docked) -> tuple:
+    """
+    Describes a port for the worker that will own it.
+
+    Args:
+        port (Port): The port.
+        docked (list): The IDs of the ships docked at the port, in the order of its current_ships.
+
+    Returns:
+        tuple: The port ID, latitude, longitude, copies of its containers and the docked ship IDs.
+    """
+    return (port.port_id, port.latitude, port.longitude,
+            [copy_container(container) for container in port.containers], docked)
+
+
+class Region:
+    """
+    The ports of one region, the ships docked at them and their containers, owned by one worker.
+
+    A voyage out of the region follows the rules of Ship.sail_to() in two halves: the
+    origin region undocks the ship with undock() and, if the destination belongs to
+    another region, gives it up with hand_over(); the destination region takes it over
+    with take_over() and docks it with dock().
+
+    Attributes:
+        ports (dict): The ports of the region keyed by port ID.
+        ships (dict): The ships docked at (or sailing between) the ports keyed by ship ID.
+        containers (dict): The containers at the ports or on the ships keyed by container ID.
+    """
+
+    def __init__(self, ports, ships, containers):
+        """
+        Initializes the region with objects it owns.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID.
+            containers (dict): The containers keyed by container ID.
+        """
+        self.ports = ports
+        self.ships = ships
+        self.containers = containers
+
+    @staticmethod
+    def objects_from_records(port_records, ship_records) -> tuple:
+        """
+        Rebuilds the ports, ships and containers of a region in its worker.
+
+        Args:
+            port_records (list): The port_record() of every port of the region.
+            ship_records (list): Tuples of (copy_ship() of a ship, ID of the port it is docked at).
+
+        Returns:
+            tuple: The ports, ships and containers, each keyed by ID.
+        """
+        from port import Port
+        ports = {}
+        ships = {}
+        containers = {}
+        for port_id, latitude, longitude, port_containers, _ in port_records:
+            port = ports[port_id] = Port(port_id, latitude, longitude)
+            port.containers = port_containers
+            containers.update((container.container_id, container) for container in port_containers)
+        for ship, port_id in ship_records:
+            ship.current_port = ports[port_id]
+            ships[ship.ship_id] = ship
+            containers.update((container.container_id, container) for container in ship.containers)
+        for port_id, _, _, _, docked in port_records:
+            ports[port_id].current_ships.extend(ships[ship_id] for ship_id in docked)
+        return ports, ships, containers
+
+    def undock(self, ship, required_fuel) -> bool:
+        """
+        Lets a ship leave its port if it has the fuel for the voyage, burning the fuel.
+
+        Args:
+            ship (Ship): A ship of the region.
+            required_fuel (float): The fuel the voyage takes.
+
+        Returns:
+            bool: True if the ship left, False if it lacks the fuel.
+        """
+        if ship.fuel < required_fuel:  # Same rule as Ship.sail_to()
+            return False
+        ship.fuel -= required_fuel
+        ship.current_port.outgoing_ship(ship)
+        return True
+
+    def hand_over(self, ship):
+        """
+        Removes an undocked ship and its load from the region, to send it to another one.
+
+        Args:
+            ship (Ship): A ship of the region that left its port.
+
+        Returns:
+            Ship: The ship, whose current_port is now None.
+        """
+        del self.ships[ship.ship_id]
+        for container in ship.containers:
+            self.containers.pop(container.container_id, None)
+        ship.current_port = None
+        return ship
+
+    def take_over(self, ship):
+        """
+        Adds a ship handed over by another region, and its load, to the region.
+
+        Args:
+            ship (Ship): The ship returned by hand_over().
+        """
+        self.ships[ship.ship_id] = ship
+        self.containers.update((container.container_id, container) for container in ship.containers)
+
+    def dock(self, ship, port):
+        """
+        Docks a ship of the region at one of its ports.
+
+        Args:
+            ship (Ship): The ship.
+            port (Port): The port.
+        """
+        port.incoming_ship(ship)
+        ship.current_port = port
@@ -1,5 +1,10 @@
+from operator import attrgetter
 from typing import TYPE_CHECKING
 from i_ship import IShip
+from fuel_consumption import ConsumptionTracker
+from indexed_list import IndexedList
+from container_loading import FIRST_FIT_DECREASING, select_containers
+from container_store import ContainerStore
 
 if TYPE_CHECKING:
     from container import Container
@@ -16,7 +21,10 @@ class Ship(IShip):
         max_weight (float): The maximum weight the ship can carry.
         max_containers (int): The maximum number of containers the ship can hold.
         fuel_consumption_per_km (float): The fuel consumed by the ship per kilometer.
-        containers (list): A list of containers currently loaded on the ship.
+        containers (IndexedList): The containers currently loaded on the ship, keyed by container ID.
+        consumption_tracker (ConsumptionTracker): Running fuel consumption totals of the loaded containers.
+        total_weight (float): The running total weight of the loaded containers.
+        version (int): A counter increased on every change of the ship's fuel or load.
     """
 
     def __init__(self, ship_id, fuel, current_port, max_weight, max_containers, fuel_consumption_per_km):
@@ -32,12 +40,32 @@ class Ship(IShip):
             fuel_consumption_per_km (float): The fuel consumption rate per kilometer.
         """
         self.ship_id = ship_id
-        self.fuel = fuel
+        self._fuel = fuel
         self.current_port = current_port
         self.max_weight = max_weight
         self.max_containers = max_containers
         self.fuel_consumption_per_km = fuel_consumption_per_km
-        self.containers = []
+        self.containers = IndexedList(attrgetter('container_id'))
+        self.consumption_tracker = ConsumptionTracker()
+        self.total_weight = 0.0
+        self.version = 0
+
+    def mark_changed(self):
+        """
+        Records a change of the ship and marks the port it is docked at as changed.
+        """
+        self.version += 1
+        if self.current_port is not None:
+            self.current_port.mark_changed()
+
+    @property
+    def fuel(self):
+        return self._fuel
+
+    @fuel.setter
+    def fuel(self, value):
+        self._fuel = value
+        self.mark_changed()
 
     def sail_to(self, destination_port: 'Port') -> bool:
         """
@@ -79,10 +107,14 @@ class Ship(IShip):
             container (Container): The container to load onto the ship.
 
         Returns:
-            bool: True if the container was successfully loaded, False if the ship has reached its container capacity.
+            bool: True if the container was successfully loaded, False if the ship has reached its container capacity
+            or a container with the same ID is already on board.
         """
-        if len(self.containers) < self.max_containers:
+        if len(self.containers) < self.max_containers and self.containers.get(container.container_id) is None:
             self.containers.append(container)
+            self.consumption_tracker.add(container)
+            self.total_weight += container.weight
+            self.mark_changed()
             return True
         return False
 
@@ -98,5 +130,105 @@ class Ship(IShip):
         """
         if container in self.containers:
             self.containers.remove(container)
+            self.consumption_tracker.remove(container)
+            self.total_weight -= container.weight
+            self.mark_changed()
             return True
         return False
+
+    def restore_containers(self, containers, totals_from=None):
+        """
+        Replaces the load with the given containers as is, without checking the ship's limits.
+
+        This is for rebuilding a ship whose load was valid when it was saved or copied;
+        the consumption totals and total_weight are brought in line with the new load.
+
+        Args:
+            containers (iterable): The containers on board, in order.
+            totals_from (Ship): A ship carrying the same containers whose running totals are
+                copied instead of recomputed, so that a copy matches the original exactly.
+        """
+        self.containers.clear()
+        self.containers.extend(containers)
+        if totals_from is None:
+            self.consumption_tracker.reset(self.containers)
+            self.total_weight = sum(container.weight for container in self.containers)
+        else:
+            self.consumption_tracker.weight_by_type = dict(totals_from.consumption_tracker.weight_by_type)
+            self.consumption_tracker.other = totals_from.consumption_tracker.other
+            self.total_weight = totals_from.total_weight
+        self.mark_changed()
+
+    def load_containers(self, containers, strategy=FIRST_FIT_DECREASING, value=None) -> tuple:
+        """
+        Loads the best subset of several containers that fits both the container and the weight limit.
+
+        Unlike load_container(), this enforces max_weight against the running total_weight.
+
+        Args:
+            containers (iterable): The candidate containers.
+            strategy (str): "first_fit_decreasing", "value_density" or "exact" (see select_containers()).
+            value (callable): Returns the value of a container; defaults to its weight.
+
+        Returns:
+            tuple: The list of loaded containers and the list of rejected ones.
+        """
+        candidates = []
+        rejected = []
+        seen = set()
+        for container in containers:
+            # Containers already on board, or repeated among the candidates, cannot be loaded again
+            if container.container_id in seen or self.containers.get(container.container_id) is not None:
+                rejected.append(container)
+            else:
+                seen.add(container.container_id)
+                candidates.append(container)
+        loaded, not_loaded = select_containers(
+            candidates,
+            self.max_containers - len(self.containers),
+            self.max_weight - self.total_weight,
+            strategy,
+            value
+        )
+        for container in loaded:
+            self.load_container(container)
+        return loaded, not_loaded + rejected
+
+    def load_from_port(self, strategy=FIRST_FIT_DECREASING, value=None) -> tuple:
+        """
+        Moves the best subset of the containers stored at the current port onto the ship.
+
+        Args:
+            strategy (str): "first_fit_decreasing", "value_density" or "exact" (see select_containers()).
+            value (callable): Returns the value of a container; defaults to its weight.
+
+        Returns:
+            tuple: The list of loaded containers and the list of those left at the port.
+        """
+        port_containers = self.current_port.containers
+        if isinstance(port_containers, ContainerStore):
+            candidates = [view.detach() for view in port_containers]
+        else:
+            candidates = list(port_containers)
+        loaded, rejected = self.load_containers(candidates, strategy, value)
+        if isinstance(port_containers, list):
+            loaded_ids = {id(container) for container in loaded}
+            port_containers[:] = [c for c in port_containers if id(c) not in loaded_ids]
+        else:
+            for container in loaded:
+                port_containers.remove(container)
+        self.current_port.mark_changed()
+        return loaded, rejected
+
+    def fuel_demand(self) -> tuple:
+        """
+        Returns the fuel consumption of the containers on board.
+
+        The totals are kept up to date by load_container() and unload_container(),
+        so this is O(1). Containers added to the list directly are not counted;
+        use restore_containers() to set a load without the per-container checks.
+
+        Returns:
+            tuple: The total consumption and a dict of the consumption per container type.
+        """
+        return self.consumption_tracker.total, self.consumption_tracker.by_type()
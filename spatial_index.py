@@ -0,0 +1,231 @@
+import heapq
+from array import array
+from math import radians, sin, cos, asin, sqrt, pi
+from typing import TYPE_CHECKING
+from port_registry import EARTH_RADIUS_KM
+
+if TYPE_CHECKING:
+    from port import Port
+
+
+def _unit_vector(latitude, longitude):
+    lat, lon = radians(latitude), radians(longitude)
+    return cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat)
+
+
+def _chord_to_km(chord):
+    # The straight-line distance between two points of the unit sphere grows with
+    # their great-circle distance, so nearest by chord is nearest by great circle
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, chord / 2))
+
+
+def _km_to_chord(distance):
+    return 2 * sin(min(distance / (2 * EARTH_RADIUS_KM), pi / 2))
+
+
+class PortSpatialIndex:
+    """
+    A spatial index over port coordinates for nearest-port and radius queries.
+
+    Ports are stored as points on the unit sphere in a k-d tree with bounding
+    boxes, which gives exact great-circle answers (including across the
+    antimeridian and near the poles) without scanning every port. Ports added
+    after the last build are kept in a small buffer that is scanned linearly
+    and merged into the tree once it outgrows ``rebuild_ratio`` of the tree.
+
+    The index works on the coordinates ports had when they were added; call
+    rebuild() after moving ports.
+
+    Attributes:
+        leaf_size (int): The largest number of points in a leaf of the tree.
+        rebuild_ratio (float): The buffer size, relative to the tree, that triggers a rebuild.
+    """
+
+    def __init__(self, ports=(), leaf_size=16, rebuild_ratio=0.25):
+        """
+        Initializes the index and builds it over the given ports.
+
+        Args:
+            ports (iterable): The ports to index.
+            leaf_size (int): The largest number of points in a leaf of the tree.
+            rebuild_ratio (float): The buffer size, relative to the tree, that triggers a rebuild.
+        """
+        self.leaf_size = leaf_size
+        self.rebuild_ratio = rebuild_ratio
+        self._ports = []
+        self._x = array('d')
+        self._y = array('d')
+        self._z = array('d')
+        self._tree_size = 0  # Points [0, tree_size) are in the tree, the rest are buffered
+        self._order = []
+        self._nodes = []
+        for port in ports:
+            self._append(port)
+        self.rebuild()
+
+    def __len__(self):
+        return len(self._ports)
+
+    def _append(self, port):
+        x, y, z = _unit_vector(port.latitude, port.longitude)
+        self._ports.append(port)
+        self._x.append(x)
+        self._y.append(y)
+        self._z.append(z)
+
+    def add(self, port: 'Port'):
+        """
+        Adds a port to the index, rebuilding the tree when the buffer of new ports grows too large.
+
+        Args:
+            port (Port): The port to add.
+        """
+        self._append(port)
+        if len(self._ports) - self._tree_size > max(self.leaf_size, self.rebuild_ratio * self._tree_size):
+            self.rebuild()
+
+    def rebuild(self):
+        """
+        Rebuilds the tree over all indexed ports, re-reading their coordinates.
+        """
+        ports = self._ports
+        self._ports = []
+        self._x, self._y, self._z = array('d'), array('d'), array('d')
+        for port in ports:
+            self._append(port)
+        self._tree_size = len(self._ports)
+        self._order = list(range(self._tree_size))
+        # Each node is [lo, hi, left, right, min_x, max_x, min_y, max_y, min_z, max_z]
+        self._nodes = []
+        if self._tree_size:
+            self._build(0, self._tree_size)
+
+    def _build(self, lo, hi):
+        order = self._order
+        columns = (self._x, self._y, self._z)
+        bounds = []
+        for column in columns:
+            values = [column[i] for i in order[lo:hi]]
+            bounds.extend((min(values), max(values)))
+        node = len(self._nodes)
+        self._nodes.append([lo, hi, -1, -1] + bounds)
+        if hi - lo > self.leaf_size:
+            axis = max(range(3), key=lambda a: bounds[2 * a + 1] - bounds[2 * a])
+            column = columns[axis]
+            order[lo:hi] = sorted(order[lo:hi], key=column.__getitem__)
+            middle = (lo + hi) // 2
+            left = self._build(lo, middle)
+            right = self._build(middle, hi)
+            self._nodes[node][2] = left
+            self._nodes[node][3] = right
+        return node
+
+    @staticmethod
+    def _box_distance2(node, x, y, z):
+        total = 0.0
+        for value, low, high in ((x, node[4], node[5]), (y, node[6], node[7]), (z, node[8], node[9])):
+            if value < low:
+                total += (low - value) ** 2
+            elif value > high:
+                total += (value - high) ** 2
+        return total
+
+    def nearest(self, latitude, longitude, k=1, exclude=None) -> list:
+        """
+        Finds the k ports closest to a point.
+
+        Args:
+            latitude (float): The latitude of the point in degrees.
+            longitude (float): The longitude of the point in degrees.
+            k (int): The number of ports to return.
+            exclude (Port): A port to leave out of the result, e.g. the one the query is made from.
+
+        Returns:
+            list: Pairs of (great-circle distance in kilometers, Port), closest first.
+        """
+        if k <= 0:
+            return []
+        x, y, z = _unit_vector(latitude, longitude)
+        xs, ys, zs, ports = self._x, self._y, self._z, self._ports
+        heap = []  # Max-heap of (-squared chord, index) holding the best k so far
+
+        def consider(i):
+            if ports[i] is exclude:
+                return
+            d2 = (xs[i] - x) ** 2 + (ys[i] - y) ** 2 + (zs[i] - z) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, i))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, i))
+
+        for i in range(self._tree_size, len(ports)):
+            consider(i)
+        if self._nodes:
+            nodes, order = self._nodes, self._order
+            stack = [(0.0, 0)]
+            while stack:
+                box2, node_id = stack.pop()
+                if len(heap) == k and box2 >= -heap[0][0]:
+                    continue
+                node = nodes[node_id]
+                if node[2] < 0:
+                    for position in range(node[0], node[1]):
+                        consider(order[position])
+                    continue
+                children = [(self._box_distance2(nodes[child], x, y, z), child) for child in (node[2], node[3])]
+                children.sort(reverse=True)  # The closer child is popped first
+                stack.extend(children)
+        return [(_chord_to_km(sqrt(-d2)), ports[i]) for d2, i in sorted(heap, reverse=True)]
+
+    def within(self, latitude, longitude, radius) -> list:
+        """
+        Finds all ports within a great-circle radius of a point.
+
+        Args:
+            latitude (float): The latitude of the point in degrees.
+            longitude (float): The longitude of the point in degrees.
+            radius (float): The radius in kilometers.
+
+        Returns:
+            list: Pairs of (great-circle distance in kilometers, Port), closest first.
+        """
+        x, y, z = _unit_vector(latitude, longitude)
+        limit2 = _km_to_chord(radius) ** 2
+        xs, ys, zs, ports = self._x, self._y, self._z, self._ports
+        found = []
+
+        def consider(i):
+            d2 = (xs[i] - x) ** 2 + (ys[i] - y) ** 2 + (zs[i] - z) ** 2
+            if d2 <= limit2:
+                found.append((d2, i))
+
+        for i in range(self._tree_size, len(ports)):
+            consider(i)
+        if self._nodes:
+            nodes, order = self._nodes, self._order
+            stack = [0]
+            while stack:
+                node = nodes[stack.pop()]
+                if self._box_distance2(node, x, y, z) > limit2:
+                    continue
+                if node[2] < 0:
+                    for position in range(node[0], node[1]):
+                        consider(order[position])
+                else:
+                    stack.append(node[2])
+                    stack.append(node[3])
+        found.sort()
+        return [(_chord_to_km(sqrt(d2)), ports[i]) for d2, i in found]
+
+    def nearest_ports(self, port: 'Port', k=1) -> list:
+        """
+        Finds the k ports closest to a port, not counting the port itself.
+
+        Args:
+            port (Port): The port the query is made from.
+            k (int): The number of ports to return.
+
+        Returns:
+            list: Pairs of (great-circle distance in kilometers, Port), closest first.
+        """
+        return self.nearest(port.latitude, port.longitude, k, exclude=port)
@@ -0,0 +1,5 @@
+import main
+
+
+def test_check_startup_meets_targets():
+    assert main.check_startup() == 0
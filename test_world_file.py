@@ -0,0 +1,26 @@
+from port import Port
+from ship import Ship
+from world_file import load_world, save_world
+
+
+def test_accessing_one_ship_builds_one_port(tmp_path):
+    # Every port docks one ship and has the next port's ship in its history, so eager
+    # linking would build the whole chain from any of its ships
+    ports = {i: Port(i, i % 170 - 85, i % 350 - 175) for i in range(200)}
+    ships = {}
+    for i, port in ports.items():
+        ships[i] = Ship(i, 100.0, port, 1000, 10, 1.0)
+        port.current_ships.append(ships[i])
+    for i in range(len(ports) - 1):
+        ports[i].history.append(ships[i + 1])
+    path = tmp_path / "chain.pwld"
+    save_world(path, ports, ships)
+
+    world = load_world(path)
+    ship = world.ships[7]
+    assert (len(world._port_objects), len(world._ship_objects)) == (0, 1)
+    assert ship.current_port.port_id == 7
+    assert (len(world._port_objects), len(world._ship_objects)) == (1, 1)
+    assert ship.current_port.history[0] is world.ships[8]
+    assert (len(world._port_objects), len(world._ship_objects)) == (1, 2)
+    assert world.ships[8].current_port is world.ports[8]
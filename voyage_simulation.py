@@ -0,0 +1,413 @@
+import multiprocessing
+import pickle
+import time
+from math import radians
+from operator import attrgetter
+from port_registry import haversine
+from sharding import Region, copy_ship, longitude_regions, port_record
+
+STEP = "step"
+STOP = "stop"
+
+
+class RouteStop:
+    """
+    A stop on a ship's route.
+
+    Attributes:
+        port_id (int): The ID of the port to sail to.
+        refuel (float): The amount of fuel taken on after arriving.
+        unload (tuple): IDs of containers moved from the ship to the port after arriving.
+        load (tuple): IDs of containers moved from the port onto the ship after unloading.
+    """
+
+    __slots__ = ('port_id', 'refuel', 'unload', 'load')
+
+    def __init__(self, port_id, refuel=0.0, unload=(), load=()):
+        """
+        Initializes the stop.
+
+        Args:
+            port_id (int): The ID of the port to sail to.
+            refuel (float): The amount of fuel taken on after arriving.
+            unload (iterable): IDs of containers to unload after arriving.
+            load (iterable): IDs of containers to load after unloading.
+        """
+        self.port_id = port_id
+        self.refuel = refuel
+        self.unload = tuple(unload)
+        self.load = tuple(load)
+
+
+class SimulationReport:
+    """
+    The outcome of a simulation run.
+
+    Attributes:
+        steps (int): The number of simulated time steps.
+        elapsed (float): The wall time of the run in seconds.
+        moves (int): The number of completed port-to-port voyages.
+        failed_moves (int): The number of voyages that were not started for lack of fuel.
+        processes (int): The number of worker processes used.
+    """
+
+    def __init__(self, steps, elapsed, moves, failed_moves, processes):
+        self.steps = steps
+        self.elapsed = elapsed
+        self.moves = moves
+        self.failed_moves = failed_moves
+        self.processes = processes
+
+    @property
+    def steps_per_second(self) -> float:
+        """
+        float: The simulated time steps per second of wall time.
+        """
+        return self.steps / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def as_dict(self) -> dict:
+        """
+        Returns the report as a plain dictionary.
+
+        Returns:
+            dict: The fields of the report and the steps per second.
+        """
+        return {
+            "steps": self.steps,
+            "elapsed": self.elapsed,
+            "steps_per_second": self.steps_per_second,
+            "moves": self.moves,
+            "failed_moves": self.failed_moves,
+            "processes": self.processes
+        }
+
+
+class _Partition(Region):
+    """
+    The ports of one region, the ships docked at them and their containers, stepped by one process.
+
+    A step has two halves. depart() lets every ship of the partition that has the fuel
+    leave for its next stop; a ship bound for a port of another partition is removed
+    and handed over (see sharding.Region). arrive() docks the ships bound for the
+    partition's ports, its own and the ones handed over, in ship ID order, and carries
+    out their stops.
+    """
+
+    def __init__(self, ports, ships, containers, routes, positions, coordinates, loop, owners=None):
+        super().__init__(ports, ships, containers)  # The containers are looked up by the stops
+        self.routes = routes
+        self.positions = positions  # ship_id -> index of the ship's next stop
+        self.coordinates = coordinates  # port_id -> (latitude, longitude) in radians of every port
+        self.loop = loop
+        self.owners = owners  # port_id -> partition index of every port; None if all ports are local
+        self._in_transit = []
+
+    @classmethod
+    def from_records(cls, port_records, ship_records, routes, positions, coordinates, loop, owners) -> '_Partition':
+        # Rebuilds the partition in a worker from the records made by VoyageSimulator._records()
+        ports, ships, containers = Region.objects_from_records(port_records, ship_records)
+        return cls(ports, ships, containers, routes, positions, coordinates, loop, owners)
+
+    def _next_stop(self, ship_id):
+        route = self.routes.get(ship_id)
+        position = self.positions.get(ship_id)
+        if route is None or position is None:
+            return None
+        if position >= len(route):
+            if not self.loop or not route:
+                return None
+            position = self.positions[ship_id] = 0
+        return route[position]
+
+    def depart(self) -> tuple:
+        """
+        Lets every ship that has the fuel for its next voyage leave its port.
+
+        Returns:
+            tuple: The ships handed over, as lists of (ship, position) keyed by partition
+            index, and the numbers of ships that left and of ships that lacked the fuel.
+        """
+        handoffs = {}
+        moves = failed = 0
+        coordinates = self.coordinates
+        for ship_id in sorted(self.ships):
+            stop = self._next_stop(ship_id)
+            if stop is None:
+                continue
+            ship = self.ships[ship_id]
+            lat1, lon1 = coordinates[ship.current_port.port_id]
+            lat2, lon2 = coordinates[stop.port_id]
+            required_fuel = haversine(lat1, lon1, lat2, lon2) * ship.fuel_consumption_per_km
+            if not self.undock(ship, required_fuel):
+                failed += 1  # The ship waits and tries again in the next step
+                continue
+            moves += 1
+            if stop.port_id in self.ports:
+                self._in_transit.append(ship)
+                continue
+            handoffs.setdefault(self.owners[stop.port_id], []).append((self.hand_over(ship), self.positions.pop(ship_id)))
+        return handoffs, moves, failed
+
+    def arrive(self, arrivals=()):
+        """
+        Docks the ships in transit to the partition's ports and carries out their stops.
+
+        Args:
+            arrivals (list): Tuples of (ship, position) handed over by other partitions.
+        """
+        for ship, position in arrivals:
+            self.take_over(ship)
+            self.positions[ship.ship_id] = position
+            self._in_transit.append(ship)
+        containers = self.containers
+        for ship in sorted(self._in_transit, key=attrgetter('ship_id')):
+            stop = self.routes[ship.ship_id][self.positions[ship.ship_id]]
+            destination = self.ports[stop.port_id]
+            self.dock(ship, destination)
+            self.positions[ship.ship_id] += 1
+            if stop.refuel:
+                ship.refuel(stop.refuel)
+            # A container the partition does not hold is neither on the ship nor at its port
+            for container_id in stop.unload:
+                container = containers.get(container_id)
+                if container is not None and ship.unload_container(container):
+                    destination.add_container(container)
+            for container_id in stop.load:
+                container = containers.get(container_id)
+                if container is not None and container in destination.containers and ship.load_container(container):
+                    destination.remove_container(container)
+        self._in_transit = []
+
+    def state(self) -> tuple:
+        """
+        Returns the state of the partition's ports and ships, undocking the ships; this is the partition's last call.
+
+        Returns:
+            tuple: Lists of (port ID, container IDs, docked ship IDs, history ship IDs) and of
+            (ship, port ID, position), where each ship is undocked so that it can be sent alone.
+        """
+        ports = [(port_id, [container.container_id for container in port.containers],
+                  [ship.ship_id for ship in port.current_ships], [ship.ship_id for ship in port.history])
+                 for port_id, port in self.ports.items()]
+        ships = []
+        for ship_id, ship in self.ships.items():
+            ships.append((ship, ship.current_port.port_id, self.positions.get(ship_id)))
+            ship.current_port = None
+        return ports, ships
+
+
+def _serve(connection, port_records, ship_records, routes, positions, coordinates, loop, owners):
+    """
+    Runs a partition in a worker process: each (STEP, arrivals) request docks the ships
+    handed over and departs the next voyages; (STOP, arrivals) docks them and returns the state.
+
+    Handed-over ships travel as one pickled batch per destination partition, so the main
+    process passes them on without unpickling them.
+    """
+    try:
+        partition = _Partition.from_records(port_records, ship_records, routes, positions, coordinates, loop, owners)
+    except Exception as error:
+        partition = error
+    while True:
+        try:
+            command, arrivals = connection.recv()
+        except EOFError:
+            return  # The main process gave up on the run
+        try:
+            if isinstance(partition, Exception):
+                raise partition
+            partition.arrive([arrival for batch in arrivals for arrival in pickle.loads(batch)])
+            if command == STEP:
+                handoffs, moves, failed = partition.depart()
+                handoffs = {index: pickle.dumps(batch, pickle.HIGHEST_PROTOCOL) for index, batch in handoffs.items()}
+                connection.send((True, (handoffs, moves, failed)))
+            else:
+                connection.send((True, partition.state()))
+        except Exception as error:
+            connection.send((False, error))
+        if command == STOP:
+            connection.close()
+            return
+
+
+class VoyageSimulator:
+    """
+    Simulates many ships sailing along their routes over discrete time steps.
+
+    The ports are split by longitude into one region per worker process, and each
+    worker owns the state of its region: the ports, the ships docked at them and their
+    containers. Every step, each worker departs its ships and then docks the ones bound
+    for its ports, refuelling and moving containers as their stops say. A ship bound
+    for another region is the only thing that crosses processes: it is handed over at
+    the step boundary, through the main process, which only routes these handovers.
+    Ships dock at every port in ship ID order, so the result does not depend on the
+    number of workers and matches calling Ship.sail_to() in ship ID order. The live
+    Port and Ship objects are updated once, at the end of run().
+
+    With 0 or 1 processes, one partition steps the live objects in the main process.
+
+    Attributes:
+        ports (dict): The ports keyed by port ID.
+        ships (dict): The ships keyed by ship ID.
+        routes (dict): Lists of RouteStop (or plain port IDs) keyed by ship ID.
+        containers (dict): The containers keyed by container ID, used by load and unload stops.
+        processes (int): The number of worker processes; 0 or 1 runs in the main process.
+        loop (bool): Whether ships start their route again after the last stop.
+    """
+
+    def __init__(self, ports, ships, routes, containers=None, processes=None, loop=False):
+        """
+        Initializes the simulator.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID.
+            routes (dict): Lists of RouteStop or port IDs keyed by ship ID.
+            containers (dict): The containers keyed by container ID.
+            processes (int): The number of worker processes; None uses the CPU count.
+            loop (bool): Whether ships start their route again after the last stop.
+        """
+        self.ports = ports
+        self.ships = ships
+        self.routes = {ship_id: [stop if isinstance(stop, RouteStop) else RouteStop(stop) for stop in route]
+                       for ship_id, route in routes.items()}
+        self.containers = containers or {}
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.loop = loop
+        self._positions = {ship_id: 0 for ship_id in self.routes}
+
+    def _coordinates(self):
+        return {port_id: (radians(port.latitude), radians(port.longitude)) for port_id, port in self.ports.items()}
+
+    def _check_containers(self):
+        for ship_id, route in self.routes.items():
+            for stop in route:
+                for container_id in stop.unload + stop.load:
+                    if container_id not in self.containers:
+                        raise KeyError(f"Ship {ship_id} stops for unknown container {container_id}")
+
+    def _records(self, owners, partitions):
+        # Copies of every port and docked ship, with their containers, and the ships' positions, grouped by partition
+        port_records = [[] for _ in range(partitions)]
+        ship_records = [[] for _ in range(partitions)]
+        positions = [{} for _ in range(partitions)]
+        copied = set()
+        for port_id, port in self.ports.items():
+            owner = owners[port_id]
+            port_records[owner].append(port_record(port, [ship.ship_id for ship in port.current_ships]))
+            for ship in port.current_ships:
+                ship_records[owner].append((copy_ship(ship), port_id))
+                copied.add(ship.ship_id)
+        for ship_id in self.routes:
+            ship = self.ships[ship_id]
+            owner = owners[ship.current_port.port_id]
+            if ship_id not in copied:
+                ship_records[owner].append((copy_ship(ship), ship.current_port.port_id))
+            positions[owner][ship_id] = self._positions[ship_id]
+        return port_records, ship_records, positions
+
+    def _apply_state(self, port_states, ship_states, docked_ships):
+        # Writes the state gathered from the workers back to the live ports and ships
+        containers = dict(self.containers)
+        for port in self.ports.values():
+            containers.update((container.container_id, container) for container in port.containers)
+        for ship in docked_ships.values():
+            containers.update((container.container_id, container) for container in ship.containers)
+        for copy, port_id, position in ship_states:
+            if copy.ship_id not in self.routes:
+                continue  # Not simulated, so not changed
+            ship = self.ships[copy.ship_id]
+            ship.current_port = self.ports[port_id]
+            ship.restore_containers((containers[container.container_id] for container in copy.containers), totals_from=copy)
+            ship.fuel = copy.fuel  # Also marks the ship and its port as changed
+            self._positions[copy.ship_id] = position
+        for port_id, container_ids, docked, history in port_states:
+            port = self.ports[port_id]
+            port.current_ships.clear()
+            port.current_ships.extend(docked_ships[ship_id] for ship_id in docked)
+            # The workers' histories only hold the ships that docked during the run
+            port.history.extend(docked_ships[ship_id] for ship_id in history if port.history.get(ship_id) is None)
+            port.containers = [containers[container_id] for container_id in container_ids]
+
+    def _run_partitioned(self, steps, partitions):
+        owners = longitude_regions(self.ports, partitions)
+        port_records, ship_records, positions = self._records(owners, partitions)
+        docked_ships = {ship.ship_id: ship for port in self.ports.values() for ship in port.current_ships}
+        docked_ships.update((ship_id, self.ships[ship_id]) for ship_id in self.routes)
+        coordinates = self._coordinates()
+        connections = []
+        processes = []
+        for partition in range(partitions):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve, args=(worker_connection, port_records[partition], ship_records[partition],
+                                     self.routes, positions[partition], coordinates, self.loop, owners),
+                daemon=True)
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            processes.append(process)
+
+        def exchange(command, arrivals):
+            # Every answer is read before a worker's error is raised, so that no worker is left waiting
+            for connection, batch in zip(connections, arrivals):
+                connection.send((command, batch))
+            answers = [connection.recv() for connection in connections]
+            for ok, value in answers:
+                if not ok:
+                    raise value
+            return [value for _, value in answers]
+
+        moves = failed = 0
+        arrivals = [[] for _ in range(partitions)]
+        states = None
+        try:
+            for _ in range(steps):
+                answers = exchange(STEP, arrivals)
+                arrivals = [[] for _ in range(partitions)]
+                for handoffs, step_moves, step_failed in answers:
+                    moves += step_moves
+                    failed += step_failed
+                    for partition, batch in handoffs.items():
+                        arrivals[partition].append(batch)
+            states = exchange(STOP, arrivals)
+        finally:
+            for connection in connections:
+                connection.close()
+            for process in processes:
+                if states is None:
+                    process.terminate()  # The run failed; the workers still wait for a request
+                process.join()
+        self._apply_state([state for ports, _ in states for state in ports],
+                          [state for _, ships in states for state in ships], docked_ships)
+        return moves, failed
+
+    def run(self, steps) -> SimulationReport:
+        """
+        Runs the simulation for a number of time steps.
+
+        Args:
+            steps (int): The number of time steps to simulate.
+
+        Returns:
+            SimulationReport: The counts of the run and its steps per second.
+
+        Raises:
+            KeyError: If a stop names a container that is not in containers.
+        """
+        self._check_containers()
+        partitions = min(self.processes, len(self.ports))
+        moves = failed = 0
+        start = time.perf_counter()
+        if partitions <= 1:
+            partition = _Partition(self.ports, self.ships, self.containers, self.routes, self._positions,
+                                   self._coordinates(), self.loop)
+            for _ in range(steps):
+                _, step_moves, step_failed = partition.depart()
+                partition.arrive()
+                moves += step_moves
+                failed += step_failed
+        else:
+            moves, failed = self._run_partitioned(steps, partitions)
+        elapsed = time.perf_counter() - start
+        return SimulationReport(steps, elapsed, moves, failed, max(partitions, 1))
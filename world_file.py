@@ -0,0 +1,321 @@
+import mmap
+import struct
+from array import array
+from collections.abc import Mapping
+from operator import attrgetter
+from container import CONTAINER_TYPE_CODES, container_type_name
+from container_store import ContainerStore
+from indexed_list import IndexedList
+from port import Port
+from port_registry import PortRegistry
+from ship import Ship
+
+MAGIC = b"PWLD"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sII")  # magic, version, number of columns
+_COLUMN = struct.Struct("<24scxxxQQ")  # name, typecode, offset, item count
+_ALIGNMENT = 8
+
+# Columns of format version 1. Rows of ports, ships and containers are kept in their
+# original order; *_sorted columns hold the rows ordered by ID for lookups, and
+# *_offsets/*_rows pairs hold lists per port or ship (row i owns rows[offsets[i]:offsets[i + 1]]).
+COLUMNS = (
+    ("port_ids", "q"), ("port_lat", "d"), ("port_lon", "d"), ("port_sorted", "q"),
+    ("port_cont_offsets", "q"), ("port_cont_rows", "q"),
+    ("port_ship_offsets", "q"), ("port_ship_rows", "q"),
+    ("port_hist_offsets", "q"), ("port_hist_rows", "q"),
+    ("ship_ids", "q"), ("ship_fuel", "d"), ("ship_port_rows", "q"), ("ship_max_weight", "d"),
+    ("ship_max_cont", "q"), ("ship_rate", "d"), ("ship_sorted", "q"),
+    ("ship_cont_offsets", "q"), ("ship_cont_rows", "q"),
+    ("cont_ids", "q"), ("cont_weights", "d"), ("cont_codes", "B"), ("cont_sorted", "q"),
+)
+
+
+def _lists_to_columns(lists):
+    offsets = array('q', [0])
+    rows = array('q')
+    for items in lists:
+        rows.extend(items)
+        offsets.append(len(rows))
+    return offsets, rows
+
+
+def save_world(path, ports, ships, containers=()):
+    """
+    Writes a world to a versioned binary columnar file.
+
+    The file holds every port, ship and container, which containers sit at which
+    port or on which ship, the ships docked at each port and each port's history.
+
+    Args:
+        path (str): The path of the file to write.
+        ports (dict): The ports keyed by port ID.
+        ships (dict): The ships keyed by ship ID.
+        containers (iterable): Extra containers that are neither at a port nor on a ship.
+
+    Raises:
+        ValueError: If a container is not of one of the registered types.
+        KeyError: If a port or ship refers to a port or ship that is not part of the world.
+    """
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    container_rows = {}
+
+    def container_row(container):
+        key = (container.container_id, container.weight, container_type_name(container))
+        row = container_rows.get(key)
+        if row is None:
+            if key[2] is None:
+                raise ValueError(f"Container {container.container_id} is not of a registered type")
+            row = container_rows[key] = len(columns["cont_ids"])
+            columns["cont_ids"].append(container.container_id)
+            columns["cont_weights"].append(container.weight)
+            columns["cont_codes"].append(CONTAINER_TYPE_CODES[key[2]])
+        return row
+
+    port_rows = {port_id: row for row, port_id in enumerate(ports)}
+    ship_rows = {ship_id: row for row, ship_id in enumerate(ships)}
+
+    for port in ports.values():
+        columns["port_ids"].append(port.port_id)
+        columns["port_lat"].append(port.latitude)
+        columns["port_lon"].append(port.longitude)
+    for ship in ships.values():
+        columns["ship_ids"].append(ship.ship_id)
+        columns["ship_fuel"].append(ship.fuel)
+        columns["ship_port_rows"].append(port_rows[ship.current_port.port_id] if ship.current_port is not None else -1)
+        columns["ship_max_weight"].append(ship.max_weight)
+        columns["ship_max_cont"].append(ship.max_containers)
+        columns["ship_rate"].append(ship.fuel_consumption_per_km)
+
+    for prefix, lists in (
+        ("port_cont", ([container_row(c) for c in port.containers] for port in ports.values())),
+        ("port_ship", ([ship_rows[s.ship_id] for s in port.current_ships] for port in ports.values())),
+        ("port_hist", ([ship_rows[s.ship_id] for s in port.history] for port in ports.values())),
+        ("ship_cont", ([container_row(c) for c in ship.containers] for ship in ships.values())),
+    ):
+        columns[prefix + "_offsets"], columns[prefix + "_rows"] = _lists_to_columns(lists)
+    for container in containers:
+        container_row(container)
+
+    for prefix in ("port", "ship", "cont"):
+        ids = columns[prefix + "_ids"]
+        columns[prefix + "_sorted"] = array('q', sorted(range(len(ids)), key=ids.__getitem__))
+
+    offset = _HEADER.size + _COLUMN.size * len(COLUMNS)
+    table = []
+    for name, typecode in COLUMNS:
+        offset += -offset % _ALIGNMENT
+        table.append(_COLUMN.pack(name.encode(), typecode.encode(), offset, len(columns[name])))
+        offset += columns[name].itemsize * len(columns[name])
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(COLUMNS)))
+        f.write(b"".join(table))
+        for name, _ in COLUMNS:
+            f.write(b"\0" * (-f.tell() % _ALIGNMENT))
+            f.write(columns[name].tobytes())
+
+
+class _LazyMapping(Mapping):
+    """
+    A read-only mapping from IDs to objects that are materialized on first access.
+    """
+
+    def __init__(self, ids, sorted_rows, materialize):
+        self._ids = ids
+        self._sorted_rows = sorted_rows
+        self._materialize = materialize
+
+    def row_of(self, key):
+        """
+        Finds the row of an ID by binary search over the rows sorted by ID.
+
+        Args:
+            key (int): The ID to look up.
+
+        Returns:
+            int: The row of the ID, or -1 if it is not present.
+        """
+        ids, rows = self._ids, self._sorted_rows
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if ids[rows[middle]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(rows) and ids[rows[low]] == key:
+            return rows[low]
+        return -1
+
+    def __getitem__(self, key):
+        row = self.row_of(key) if isinstance(key, int) else -1
+        if row < 0:
+            raise KeyError(key)
+        return self._materialize(row)
+
+    def __contains__(self, key):
+        return isinstance(key, int) and self.row_of(key) >= 0
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class _MappedPort(Port):
+    # A port of a MappedWorld: current_ships and history are read from the file on first access
+    _LINKS = {"current_ships": "port_ship", "history": "port_hist"}
+
+    def __init__(self, world, row):
+        columns = world._columns
+        super().__init__(columns["port_ids"][row], columns["port_lat"][row], columns["port_lon"][row])
+        self._containers = [world._container(c) for c in world._rows("port_cont", row)]
+        self._world = world
+        self._row = row
+        del self.current_ships, self.history
+
+    def __getattr__(self, name):
+        # Only called for attributes not set yet, i.e. links that were never read or assigned
+        prefix = _MappedPort._LINKS.get(name)
+        if prefix is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        world = self._world
+        ships = IndexedList(attrgetter('ship_id'), (world._ship(s) for s in world._rows(prefix, self._row)))
+        setattr(self, name, ships)
+        return ships
+
+
+class _MappedShip(Ship):
+    # A ship of a MappedWorld: current_port is read from the file on first access
+
+    def __init__(self, world, row):
+        columns = world._columns
+        super().__init__(
+            columns["ship_ids"][row],
+            columns["ship_fuel"][row],
+            None,
+            columns["ship_max_weight"][row],
+            columns["ship_max_cont"][row],
+            columns["ship_rate"][row]
+        )
+        # The saved load is restored as is, without re-checking the ship's limits
+        self.restore_containers(world._container(c) for c in world._rows("ship_cont", row))
+        self._world = world
+        self._row = row
+        del self.current_port
+
+    def __getattr__(self, name):
+        if name != "current_port":
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        world = self._world
+        port_row = world._columns["ship_port_rows"][self._row]
+        self.current_port = world._port(port_row) if port_row >= 0 else None
+        return self.current_port
+
+
+class MappedWorld:
+    """
+    A world reloaded from a file written by save_world().
+
+    The file is memory-mapped (copy-on-write, so changes never reach the file)
+    and its columns are used in place. Ports, ships and containers are only built
+    when they are accessed through the ports, ships and containers mappings, and
+    each is built once; containers are ContainerStore views over the mapped columns.
+References between ports and ships (a port's current_ships and history, a ship's
+current_port) are only followed when they are first read, so building one object
+never builds the objects it refers to.
+
+    Attributes:
+        ports (Mapping): The ports keyed by port ID, in their saved order.
+        ships (Mapping): The ships keyed by ship ID, in their saved order.
+        containers (Mapping): The containers keyed by container ID, in their saved order.
+        registry (PortRegistry): The registry every materialized port is added to.
+    """
+
+    def __init__(self, path):
+        """
+        Maps the file and reads its column table.
+
+        Args:
+            path (str): The path of a file written by save_world().
+
+        Raises:
+            ValueError: If the file is not a world file or has an unsupported version.
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        buffer = memoryview(self._mmap)
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"{path} is not a world file")
+        magic, version, count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a world file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported world file version {version} (expected {VERSION})")
+        self._columns = {}
+        for index in range(count):
+            name, typecode, offset, length = _COLUMN.unpack_from(buffer, _HEADER.size + index * _COLUMN.size)
+            typecode = typecode.decode()
+            size = struct.calcsize(typecode)
+            self._columns[name.rstrip(b"\0").decode()] = buffer[offset:offset + size * length].cast(typecode)
+        missing = [name for name, _ in COLUMNS if name not in self._columns]
+        if missing:
+            raise ValueError(f"World file is missing columns: {', '.join(missing)}")
+
+        columns = self._columns
+        self._store = ContainerStore.from_columns(columns["cont_ids"], columns["cont_weights"], columns["cont_codes"])
+        self._port_objects = {}
+        self._ship_objects = {}
+        self._container_objects = {}
+        self.registry = PortRegistry()
+        self.ports = _LazyMapping(columns["port_ids"], columns["port_sorted"], self._port)
+        self.ships = _LazyMapping(columns["ship_ids"], columns["ship_sorted"], self._ship)
+        self.containers = _LazyMapping(columns["cont_ids"], columns["cont_sorted"], self._container)
+
+    def _rows(self, prefix, row):
+        offsets = self._columns[prefix + "_offsets"]
+        return self._columns[prefix + "_rows"][offsets[row]:offsets[row + 1]]
+
+    def _container(self, row):
+        container = self._container_objects.get(row)
+        if container is None:
+            container = self._container_objects[row] = self._store[row]
+        return container
+
+    def _port(self, row):
+        port = self._port_objects.get(row)
+        if port is None:
+            port = self._port_objects[row] = _MappedPort(self, row)
+            self.registry.add(port)
+        return port
+
+    def _ship(self, row):
+        ship = self._ship_objects.get(row)
+        if ship is None:
+            ship = self._ship_objects[row] = _MappedShip(self, row)
+        return ship
+
+    def materialize(self) -> tuple:
+        """
+        Builds every object of the world.
+
+        Returns:
+            tuple: Dicts of the ports, ships and containers keyed by ID, in their saved order.
+        """
+        return dict(self.ports.items()), dict(self.ships.items()), dict(self.containers.items())
+
+
+def load_world(path) -> MappedWorld:
+    """
+    Reloads a world written by save_world() by memory-mapping the file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        MappedWorld: The world, whose objects are built lazily on access.
+    """
+    return MappedWorld(path)
@@ -0,0 +1,310 @@
+import json
+from port import Port
+from ship import Ship
+from port_registry import PortRegistry
+from container import create_container
+
+SECTIONS = ("ports", "ships", "containers")
+ENTITY_SECTIONS = {"port": "ports", "ship": "ships", "container": "containers"}
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JSONStream:
+    """
+    A minimal pull parser over a text file that decodes one JSON value at a time.
+
+    Only the part of the file that has not been decoded yet is kept in memory,
+    so a huge top-level array can be walked element by element.
+    """
+
+    def __init__(self, file, chunk_size):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character without consuming it.
+
+        Returns:
+            str: The next significant character, or an empty string at the end of the file.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        """
+        Consumes the next significant character, which must be the given one.
+
+        Args:
+            char (str): The expected character.
+
+        Raises:
+            json.JSONDecodeError: If a different character or the end of the file is found.
+        """
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self._buffer, self._pos)
+        self._pos += 1
+
+    def value(self):
+        """
+        Decodes and consumes the next complete JSON value.
+
+        Returns:
+            object: The decoded value.
+
+        Raises:
+            json.JSONDecodeError: If the value is malformed or truncated.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number may be cut at the chunk boundary, so only accept a value
+                # that is followed by at least one more character or by the end of the file.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def array(self):
+        """
+        Yields the elements of the JSON array that starts at the current position.
+
+        Yields:
+            object: The decoded elements, one at a time.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("]")
+                return
+
+
+def iter_records(path, json_lines=None, chunk_size=1 << 16):
+    """
+    Streams the port, ship and container records of a world file.
+
+    Two layouts are accepted:
+        - a JSON document whose "ports", "ships" and "containers" keys hold arrays,
+          which are walked one element at a time;
+        - JSON Lines, one record per line, where each record names its kind in an
+          "entity" field ("port", "ship" or "container").
+
+    Args:
+        path (str): The path of the input file.
+        json_lines (bool): Whether the file is JSON Lines; None guesses it from the file suffix.
+        chunk_size (int): The number of characters read from the file at a time.
+
+    Yields:
+        tuple: Pairs of the section name ("ports", "ships" or "containers") and the record dict.
+
+    Raises:
+        json.JSONDecodeError: If the input is not valid JSON.
+    """
+    if json_lines is None:
+        json_lines = str(path).endswith(JSON_LINES_SUFFIXES)
+    with open(path, 'r', encoding='utf-8') as f:
+        if json_lines:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                section = ENTITY_SECTIONS.get(record.get("entity"))
+                if section is None:
+                    raise ValueError(f"Line {line_number}: unknown entity {record.get('entity')!r}")
+                yield section, record
+            return
+
+        stream = _JSONStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key in SECTIONS and stream.peek() == "[":
+                for record in stream.array():
+                    yield key, record
+            else:
+                stream.value()  # Unknown keys are skipped
+            if stream.peek() == ",":
+                stream.expect(",")
+            else:
+                stream.expect("}")
+                return
+
+
+class WorldLoader:
+    """
+    Builds Port, Ship and Container objects from a streamed world file.
+
+    Ports and ships are kept because the rest of the world refers to them by ID;
+    containers are handed to the caller one at a time and are not retained by the
+    loader, so its peak memory does not grow with the size of the manifest.
+
+    Attributes:
+        ports (dict): The loaded ports keyed by port ID.
+        ships (dict): The loaded ships keyed by ship ID.
+        registry (PortRegistry): The registry every loaded port is added to.
+    """
+
+    def __init__(self, path, json_lines=None, chunk_size=1 << 16):
+        """
+        Initializes the loader for the given file.
+
+        Args:
+            path (str): The path of the input file.
+            json_lines (bool): Whether the file is JSON Lines; None guesses it from the file suffix.
+            chunk_size (int): The number of characters read from the file at a time.
+        """
+        self.path = path
+        self.json_lines = json_lines
+        self.chunk_size = chunk_size
+        self.ports = {}
+        self.ships = {}
+        self.registry = PortRegistry()
+        self._waiting_ships = {}  # port ID -> records of ships whose port has not been read yet
+
+    def _add_port(self, port_data):
+        port = Port(port_data["id"], port_data["latitude"], port_data["longitude"])
+        self.ports[port_data["id"]] = port
+        self.registry.add(port)
+        # Ships that appeared before their port dock now, in file order
+        for ship_data in self._waiting_ships.pop(port_data["id"], ()):
+            self._add_ship(ship_data)
+
+    def _add_ship(self, ship_data):
+        port = self.ports.get(ship_data["current_port"])
+        if port is None:
+            self._waiting_ships.setdefault(ship_data["current_port"], []).append(ship_data)
+            return
+        ship = Ship(
+            ship_data["id"],
+            ship_data["fuel"],
+            port,
+            ship_data["max_weight"],
+            ship_data["max_containers"],
+            ship_data["fuel_consumption_per_km"]
+        )
+        self.ships[ship_data["id"]] = ship
+        port.incoming_ship(ship)
+
+    def iter_containers(self):
+        """
+        Streams the input, building ports and ships as they appear and yielding containers.
+
+        A ship that appears before its port is held back until the port is read.
+
+        Yields:
+            Container: The containers of the input, in file order.
+
+        Raises:
+            ValueError: At the end of the input, if a ship refers to a port that never appeared.
+        """
+        for container, _, _ in self.iter_placements():
+            yield container
+
+    def iter_placements(self):
+        """
+        Streams the input like iter_containers(), also yielding where each container is placed.
+
+        Yields:
+            tuple: The container, its "port_id" and its "ship_id" (None where the record has none).
+
+        Raises:
+            ValueError: At the end of the input, if a ship refers to a port that never appeared.
+        """
+        for section, record in iter_records(self.path, self.json_lines, self.chunk_size):
+            if section == "containers":
+                yield create_container(record), record.get("port_id"), record.get("ship_id")
+            elif section == "ports":
+                self._add_port(record)
+            else:
+                self._add_ship(record)
+        if self._waiting_ships:
+            port_id, ship_records = next(iter(self._waiting_ships.items()))
+            raise ValueError(f"Ship {ship_records[0]['id']} refers to unknown port {port_id}")
+
+    def place_containers(self, default_port_id=1) -> int:
+        """
+        Streams the input and stores every container at its port or loads it onto its ship.
+
+        Containers are grouped by their target in one pass over the input, so ports and
+        ships may appear after the containers that refer to them. The groups are then
+        checked in bulk: nothing is placed unless every target exists and no ship
+        would exceed its container count or weight limit.
+
+        Args:
+            default_port_id (int): The port of containers with neither "port_id" nor "ship_id".
+
+        Returns:
+            int: The number of containers placed.
+
+        Raises:
+            ValueError: If a container refers to an unknown port or ship, or a ship would be overloaded.
+        """
+        by_port = {}
+        by_ship = {}
+        count = 0
+        for container, port_id, ship_id in self.iter_placements():
+            if ship_id is not None:
+                by_ship.setdefault(ship_id, []).append(container)
+            else:
+                by_port.setdefault(default_port_id if port_id is None else port_id, []).append(container)
+            count += 1
+
+        errors = [f"unknown port {port_id}" for port_id in by_port if port_id not in self.ports]
+        errors += [f"unknown ship {ship_id}" for ship_id in by_ship if ship_id not in self.ships]
+        for ship_id, containers in by_ship.items():
+            ship = self.ships.get(ship_id)
+            if ship is None:
+                continue
+            ids = {container.container_id for container in containers}
+            if len(ids) < len(containers):
+                errors.append(f"ship {ship_id} has duplicate container IDs")
+            if len(ship.containers) + len(ids) > ship.max_containers:
+                errors.append(f"ship {ship_id} holds at most {ship.max_containers} containers")
+            if ship.total_weight + sum(container.weight for container in containers) > ship.max_weight:
+                errors.append(f"ship {ship_id} carries at most {ship.max_weight} tons")
+        if errors:
+            raise ValueError("Cannot place containers: " + ", ".join(errors))
+
+        for port_id, containers in by_port.items():
+            port = self.ports[port_id]
+            for container in containers:
+                port.add_container(container)
+        for ship_id, containers in by_ship.items():
+            ship = self.ships[ship_id]
+            ship.restore_containers([*ship.containers, *containers])  # Limits were checked above
+        return count
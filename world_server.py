@@ -0,0 +1,358 @@
+import multiprocessing
+from sharding import Region, copy_ship, longitude_regions, port_record
+
+STOP = "stop"
+
+
+class _Shard(Region):
+    """
+    The ports of one region and the ships docked at them, living in a worker process.
+    """
+
+    def __init__(self, port_records, ship_records, coordinates):
+        from port_registry import PortRegistry
+        super().__init__(*Region.objects_from_records(port_records, ship_records))
+        self.coordinates = coordinates  # port_id -> (latitude, longitude) of every port of the world
+        self.registry = PortRegistry()
+        for port in self.ports.values():
+            self.registry.add(port)
+        self._remote_ports = {}
+        self._in_transit = {}
+
+    def _port_for_distance(self, port_id):
+        port = self.ports.get(port_id)
+        if port is None:
+            port = self._remote_ports.get(port_id)
+        if port is None:
+            # A stand-in for a port of another shard, registered so that distances are
+            # calculated exactly as in an unsharded registry
+            from port import Port
+            port = self._remote_ports[port_id] = Port(port_id, *self.coordinates[port_id])
+            self.registry.add(port)
+        return port
+
+    def depart(self, moves):
+        # First half of a voyage: the ships that have the fuel burn it and leave their port.
+        # A ship staying in this shard waits in _in_transit; one bound for another shard
+        # is handed over.
+        results = []
+        for ship_id, port_id in moves:
+            ship = self.ships[ship_id]
+            required_fuel = ship.current_port.get_distance(self._port_for_distance(port_id)) * ship.fuel_consumption_per_km
+            if not self.undock(ship, required_fuel):
+                results.append(None)
+            elif port_id in self.ports:
+                self._in_transit[ship_id] = ship
+                results.append(True)
+            else:
+                results.append(self.hand_over(ship))
+        return results
+
+    def arrive(self, arrivals):
+        # Second half of a voyage: ships (IDs of ships in transit, or ships handed over) dock at their ports
+        for ship, port_id in arrivals:
+            if isinstance(ship, int):
+                ship = self._in_transit.pop(ship)
+            else:
+                self.take_over(ship)
+            self.dock(ship, self.ports[port_id])
+        return len(arrivals)
+
+    def refuel(self, ship_id, fuel_amount):
+        self.ships[ship_id].refuel(fuel_amount)
+
+    def load(self, ship_id, container_id):
+        # The container is taken from the ship's port, as VoyageSimulator does
+        ship = self.ships[ship_id]
+        container = self.containers.get(container_id)
+        if container is None or container not in ship.current_port.containers or not ship.load_container(container):
+            return False
+        ship.current_port.remove_container(container)
+        return True
+
+    def unload(self, ship_id, container_id):
+        ship = self.ships[ship_id]
+        container = self.containers.get(container_id)
+        if container is None or not ship.unload_container(container):
+            return False
+        ship.current_port.add_container(container)
+        return True
+
+    def port(self, port_id):
+        from port_report import port_section
+        return port_section(self.ports[port_id])
+
+    def ship(self, ship_id):
+        ship = self.ships[ship_id]
+        return {"fuel": ship.fuel, "port_id": ship.current_port.port_id,
+                "containers": [container.container_id for container in ship.containers]}
+
+    def report(self, compact):
+        from port_report import port_section, render_section
+        return {port_id: render_section(port_id, port_section(port), compact) for port_id, port in self.ports.items()}
+
+
+def _serve(connection, port_records, ship_records, coordinates):
+    """
+    Runs a shard in a worker process, answering (command, args) requests until STOP.
+    """
+    shard = _Shard(port_records, ship_records, coordinates)
+    while True:
+        command, args = connection.recv()
+        if command == STOP:
+            connection.close()
+            return
+        try:
+            connection.send((True, getattr(shard, command)(*args)))
+        except Exception as error:
+            connection.send((False, error))
+
+
+class ShardedWorld:
+    """
+    A world split by region across local worker processes.
+
+    Every shard process owns the ports of one region and the ships docked at them,
+    with their containers, and talks to this coordinator over a multiprocessing Pipe.
+    The coordinator knows which shard holds each port and ship and routes every call
+    there. A voyage follows the rules of Ship.sail_to() in two halves: the origin shard
+    checks and burns the fuel and undocks the ship, then the destination shard docks it;
+    a ship bound for another shard is handed over in between (see sharding.Region).
+    Reports are rendered by the shards in parallel and gathered in the original port
+    order, so they are identical to write_port_report() on the unsharded world.
+
+    Attributes:
+        shards (int): The number of shard processes.
+        port_shards (dict): The shard of each port, keyed by port ID.
+        ship_shards (dict): The shard of each ship, keyed by ship ID.
+    """
+
+    def __init__(self, ports, ships, shards=None, regions=None):
+        """
+        Starts the shard processes and hands each its part of the world.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID; each must be docked at one of the ports.
+            shards (int): The number of shard processes; None uses one per region, or the CPU count.
+            regions (dict): The region (shard index) of each port keyed by port ID;
+                defaults to longitude_regions().
+
+        Raises:
+            ValueError: If a ship is not docked at one of the ports.
+        """
+        if shards is None:
+            shards = max(regions.values(), default=0) + 1 if regions is not None else multiprocessing.cpu_count()
+        self.shards = shards
+        regions = regions if regions is not None else longitude_regions(ports, shards)
+        self.port_shards = {port_id: regions[port_id] for port_id in ports}
+        self._port_order = list(ports)
+        coordinates = {port_id: (port.latitude, port.longitude) for port_id, port in ports.items()}
+
+        docked = {port_id: [] for port_id in ports}
+        for ship in ships.values():
+            if ship.current_port is None or ports.get(ship.current_port.port_id) is not ship.current_port:
+                raise ValueError(f"Ship {ship.ship_id} is not docked at a port of the world")
+            docked[ship.current_port.port_id].append(ship)
+        self.ship_shards = {}
+        port_records = [[] for _ in range(self.shards)]
+        ship_records = [[] for _ in range(self.shards)]
+        for port_id, port in ports.items():
+            shard = self.port_shards[port_id]
+            # Docked ships keep the order of the port's list, which the report follows
+            order = {ship.ship_id: index for index, ship in enumerate(port.current_ships)}
+            port_ships = sorted(docked[port_id], key=lambda ship: order.get(ship.ship_id, len(order)))
+            for ship in port_ships:
+                self.ship_shards[ship.ship_id] = shard
+                ship_records[shard].append((copy_ship(ship), port_id))
+            port_records[shard].append(port_record(port, [ship.ship_id for ship in port_ships]))
+
+        self._connections = []
+        self._processes = []
+        for shard in range(self.shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve, args=(worker_connection, port_records[shard], ship_records[shard], coordinates),
+                daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _send(self, shard, command, *args):
+        self._connections[shard].send((command, args))
+
+    def _receive(self, shard):
+        ok, value = self._connections[shard].recv()
+        if not ok:
+            raise value
+        return value
+
+    def _call(self, shard, command, *args):
+        self._send(shard, command, *args)
+        return self._receive(shard)
+
+    def _gather(self, requests):
+        # Sends one request to each listed shard, then collects the answers, so the shards work in parallel.
+        # Every answer is read before a remote error is raised, so no pipe is left holding a stale reply.
+        for shard, (command, args) in requests.items():
+            self._send(shard, command, *args)
+        answers = {shard: self._connections[shard].recv() for shard in requests}
+        for ok, value in answers.values():
+            if not ok:
+                raise value
+        return {shard: value for shard, (ok, value) in answers.items()}
+
+    def sail_many(self, moves) -> list:
+        """
+        Sails several ships at once, like Ship.sail_to() for each of them.
+
+        All origin shards let their ships depart in parallel, then all destination shards
+        dock them; a ship bound for another shard is handed over on the way.
+
+        Args:
+            moves (iterable): Tuples of (ship ID, destination port ID), at most one per ship.
+
+        Returns:
+            list: For each move, True if the ship sailed and False if it lacks the fuel.
+
+        Raises:
+            ValueError: If a ship appears more than once.
+            KeyError: If a ship or destination port is not part of the world. Nothing sails then.
+        """
+        moves = list(moves)
+        if len({ship_id for ship_id, _ in moves}) < len(moves):
+            raise ValueError("A ship can only sail once per call")
+        for ship_id, port_id in moves:
+            if ship_id not in self.ship_shards:
+                raise KeyError(f"Unknown ship {ship_id}")
+            if port_id not in self.port_shards:
+                raise KeyError(f"Unknown port {port_id}")
+        by_origin = {}
+        for index, (ship_id, port_id) in enumerate(moves):
+            by_origin.setdefault(self.ship_shards[ship_id], []).append(index)
+        departed = {}
+        requests = {shard: ("depart", ([moves[index] for index in indices],)) for shard, indices in by_origin.items()}
+        for shard, answers in self._gather(requests).items():
+            for index, answer in zip(by_origin[shard], answers):
+                if answer is not None:
+                    departed[index] = moves[index][0] if answer is True else answer
+
+        # Ships dock in the order of the moves, so every port lists its ships as if the
+        # moves had been made one after another
+        arrivals = {}
+        for index in sorted(departed):
+            ship_id, port_id = moves[index]
+            destination = self.port_shards[port_id]
+            arrivals.setdefault(destination, []).append((departed[index], port_id))
+            self.ship_shards[ship_id] = destination
+        self._gather({shard: ("arrive", (batch,)) for shard, batch in arrivals.items()})
+        return [index in departed for index in range(len(moves))]
+
+    def sail_to(self, ship_id, port_id) -> bool:
+        """
+        Sails a ship to a port if it has enough fuel, like Ship.sail_to().
+
+        Args:
+            ship_id (int): The ID of the ship.
+            port_id (int): The ID of the destination port.
+
+        Returns:
+            bool: True if the ship sailed, False if it lacks the fuel.
+        """
+        return self.sail_many([(ship_id, port_id)])[0]
+
+    def refuel(self, ship_id, fuel_amount):
+        """
+        Refuels a ship, like Ship.refuel().
+
+        Args:
+            ship_id (int): The ID of the ship.
+            fuel_amount (float): The amount of fuel to add.
+        """
+        self._call(self.ship_shards[ship_id], "refuel", ship_id, fuel_amount)
+
+    def load_container(self, ship_id, container_id) -> bool:
+        """
+        Moves a container from the ship's port onto the ship.
+
+        Args:
+            ship_id (int): The ID of the ship.
+            container_id (int): The ID of the container.
+
+        Returns:
+            bool: True if the container was loaded, False if it is not at the ship's port or the ship is full.
+        """
+        return self._call(self.ship_shards[ship_id], "load", ship_id, container_id)
+
+    def unload_container(self, ship_id, container_id) -> bool:
+        """
+        Moves a container from a ship to the ship's port.
+
+        Args:
+            ship_id (int): The ID of the ship.
+            container_id (int): The ID of the container.
+
+        Returns:
+            bool: True if the container was unloaded, False if the ship does not carry it.
+        """
+        return self._call(self.ship_shards[ship_id], "unload", ship_id, container_id)
+
+    def port_info(self, port_id) -> dict:
+        """
+        Returns the report section of a port (see port_report.port_section()).
+
+        Args:
+            port_id (int): The ID of the port.
+
+        Returns:
+            dict: The section.
+        """
+        return self._call(self.port_shards[port_id], "port", port_id)
+
+    def ship_info(self, ship_id) -> dict:
+        """
+        Returns the state of a ship.
+
+        Args:
+            ship_id (int): The ID of the ship.
+
+        Returns:
+            dict: The ship's fuel, the ID of its port and the IDs of its containers.
+        """
+        return self._call(self.ship_shards[ship_id], "ship", ship_id)
+
+    def write_report(self, out=None, compact=False):
+        """
+        Writes the report of all ports, gathered from every shard.
+
+        Args:
+            out (file): A text stream to write to; defaults to sys.stdout.
+            compact (bool): Whether to write the compact, non-indented form.
+        """
+        from port_report import write_sections
+        sections = {}
+        for rendered in self._gather({shard: ("report", (compact,)) for shard in range(self.shards)}).values():
+            sections.update(rendered)
+        write_sections((sections[port_id] for port_id in self._port_order), out, compact)
+
+    def close(self):
+        """
+        Stops the shard processes.
+        """
+        for connection in self._connections:
+            try:
+                connection.send((STOP, ()))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
@@ -0,0 +1,339 @@
+from collections import namedtuple
+from math import radians
+from port_registry import haversine
+
+# Immutable states; containers, ships and history hold IDs, in the order of the live lists
+PortState = namedtuple('PortState', 'port_id latitude longitude containers ships history')
+ShipState = namedtuple('ShipState', 'ship_id fuel port_id max_weight max_containers fuel_consumption_per_km containers')
+
+# Chains of frozen layers deeper than this are merged at the next fork, down to the captured layer
+MAX_DEPTH = 32
+
+
+class _Layer:
+    """
+    A frozen set of port and ship states on top of an older layer.
+    """
+
+    __slots__ = ('ports', 'ships', 'parent', 'depth')
+
+    def __init__(self, ports, ships, parent=None):
+        self.ports = ports
+        self.ships = ships
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+
+def _flatten(layer, root) -> _Layer:
+    # Merges the layers above root into one; root holds the whole captured world and is kept as is
+    chain = []
+    while layer is not root:
+        chain.append(layer)
+        layer = layer.parent
+    ports, ships = {}, {}
+    for layer in reversed(chain):
+        ports.update(layer.ports)
+        ships.update(layer.ships)
+    return _Layer(ports, ships, root)
+
+
+class WorldSnapshot:
+    """
+    A copy-on-write view of the world for what-if planning.
+
+    A snapshot holds PortState and ShipState tuples. Its own changes go to two small
+    dicts; everything else is looked up in a chain of frozen layers shared with the
+    snapshots it was forked from or into. fork() freezes the pending changes into a
+    new layer and starts a child on top of it, so it costs O(1) and a branch only
+    stores the ports and ships it touched. Once a chain grows deeper than MAX_DEPTH,
+    the next fork merges the layers above the captured world into one, which costs
+    the number of ports and ships changed since the capture, never the whole world.
+    Container objects are never copied; the states refer to them by ID.
+
+    The methods mirror Ship.sail_to(), Ship.refuel(), Ship.load_container() and
+    Ship.unload_container(), except that loading takes the container from the ship's
+    port and unloading leaves it there, as VoyageSimulator does.
+
+    Attributes:
+        parent (WorldSnapshot): The snapshot this one was forked from, or None for a captured world.
+        containers (dict): The Container objects keyed by container ID, shared by all related snapshots.
+    """
+
+    def __init__(self, base, containers, parent=None, root=None):
+        self._base = base
+        self._ports = {}
+        self._ships = {}
+        self._fork_point = base
+        self._root = root if root is not None else base
+        self.containers = containers
+        self.parent = parent
+
+    @classmethod
+    def capture(cls, ports, ships) -> 'WorldSnapshot':
+        """
+        Captures the state of live ports and ships.
+
+        Args:
+            ports (dict): The ports keyed by port ID.
+            ships (dict): The ships keyed by ship ID.
+
+        Returns:
+            WorldSnapshot: A snapshot with no parent.
+        """
+        containers = {}
+        port_states = {}
+        for port_id, port in ports.items():
+            for container in port.containers:
+                containers[container.container_id] = container
+            port_states[port_id] = PortState(
+                port_id, port.latitude, port.longitude,
+                tuple(container.container_id for container in port.containers),
+                tuple(ship.ship_id for ship in port.current_ships),
+                tuple(ship.ship_id for ship in port.history)
+            )
+        ship_states = {}
+        for ship_id, ship in ships.items():
+            for container in ship.containers:
+                containers[container.container_id] = container
+            ship_states[ship_id] = ShipState(
+                ship_id, ship.fuel, ship.current_port.port_id if ship.current_port is not None else None,
+                ship.max_weight, ship.max_containers, ship.fuel_consumption_per_km,
+                tuple(container.container_id for container in ship.containers)
+            )
+        return cls(_Layer(port_states, ship_states), containers)
+
+    def port(self, port_id) -> PortState:
+        """
+        Returns the state of a port.
+
+        Args:
+            port_id (int): The ID of the port.
+
+        Returns:
+            PortState: The state of the port in this snapshot.
+
+        Raises:
+            KeyError: If the port is not part of the world.
+        """
+        state = self._ports.get(port_id)
+        layer = self._base
+        while state is None and layer is not None:
+            state = layer.ports.get(port_id)
+            layer = layer.parent
+        if state is None:
+            raise KeyError(port_id)
+        return state
+
+    def ship(self, ship_id) -> ShipState:
+        """
+        Returns the state of a ship.
+
+        Args:
+            ship_id (int): The ID of the ship.
+
+        Returns:
+            ShipState: The state of the ship in this snapshot.
+
+        Raises:
+            KeyError: If the ship is not part of the world.
+        """
+        state = self._ships.get(ship_id)
+        layer = self._base
+        while state is None and layer is not None:
+            state = layer.ships.get(ship_id)
+            layer = layer.parent
+        if state is None:
+            raise KeyError(ship_id)
+        return state
+
+    def fork(self) -> 'WorldSnapshot':
+        """
+        Starts a branch of this snapshot.
+
+        Returns:
+            WorldSnapshot: A child that sees this snapshot's current state and whose
+            changes stay its own until it is committed.
+        """
+        if self._ports or self._ships:
+            self._base = _Layer(self._ports, self._ships, self._base)
+            self._ports, self._ships = {}, {}
+            if self._base.depth > MAX_DEPTH:
+                self._base = _flatten(self._base, self._root)
+        return WorldSnapshot(self._base, self.containers, self, self._root)
+
+    def _touched_since(self, ancestor):
+        # IDs changed above the ancestor layer, or None if the ancestor is not on the chain
+        ports, ships = set(self._ports), set(self._ships)
+        layer = self._base
+        while layer is not None and layer is not ancestor:
+            ports.update(layer.ports)
+            ships.update(layer.ships)
+            layer = layer.parent
+        if layer is None and ancestor is not None:
+            return None
+        return ports, ships
+
+    def diff(self, other: 'WorldSnapshot') -> dict:
+        """
+        Compares this snapshot with another one of the same world.
+
+        Only the ports and ships changed since the newest layer both share are compared.
+
+        Args:
+            other (WorldSnapshot): The snapshot to compare with.
+
+        Returns:
+            dict: {"ports": {port_id: (this state, other state)}, "ships": {ship_id: (...)}}
+            for every port and ship whose state differs.
+        """
+        shared = set()
+        layer = other._base
+        while layer is not None:
+            shared.add(id(layer))
+            layer = layer.parent
+        common = self._base
+        while common is not None and id(common) not in shared:
+            common = common.parent
+        mine, theirs = self._touched_since(common), other._touched_since(common)
+        port_ids, ship_ids = mine[0] | theirs[0], mine[1] | theirs[1]
+        differences = {"ports": {}, "ships": {}}
+        for port_id in port_ids:
+            states = (self.port(port_id), other.port(port_id))
+            if states[0] != states[1]:
+                differences["ports"][port_id] = states
+        for ship_id in ship_ids:
+            states = (self.ship(ship_id), other.ship(ship_id))
+            if states[0] != states[1]:
+                differences["ships"][ship_id] = states
+        return differences
+
+    def commit(self) -> 'WorldSnapshot':
+        """
+        Writes the changes made since the fork into the parent snapshot.
+
+        Where the parent changed the same port or ship in the meantime, this snapshot's state wins.
+
+        Returns:
+            WorldSnapshot: The parent.
+
+        Raises:
+            ValueError: If this snapshot was captured rather than forked.
+        """
+        if self.parent is None:
+            raise ValueError("A captured snapshot has no parent to commit to")
+        touched = self._touched_since(self._fork_point)
+        if touched is None:
+            # The fork point was merged away; everything changed since the capture is a safe superset
+            touched = self._touched_since(self._root)
+        port_ids, ship_ids = touched
+        self.parent._ports.update((port_id, self.port(port_id)) for port_id in port_ids)
+        self.parent._ships.update((ship_id, self.ship(ship_id)) for ship_id in ship_ids)
+        return self.parent
+
+    def apply(self, ports, ships):
+        """
+        Writes the state of this snapshot to the live ports and ships it was captured from.
+
+        Only the ports and ships changed since the capture are written.
+
+        Args:
+            ports (dict): The live ports keyed by port ID.
+            ships (dict): The live ships keyed by ship ID.
+        """
+        port_ids, ship_ids = self._touched_since(self._root)  # The captured layer is always on the chain
+        containers = self.containers
+        for ship_id in ship_ids:
+            state = self.ship(ship_id)
+            ship = ships[ship_id]
+            ship.current_port = ports[state.port_id] if state.port_id is not None else None
+            ship.restore_containers(containers[container_id] for container_id in state.containers)
+            ship.fuel = state.fuel  # Also marks the ship and its port as changed
+        for port_id in port_ids:
+            state = self.port(port_id)
+            port = ports[port_id]
+            port.current_ships.clear()
+            port.current_ships.extend(ships[ship_id] for ship_id in state.ships)
+            port.history.clear()
+            port.history.extend(ships[ship_id] for ship_id in state.history)
+            port.containers = [containers[container_id] for container_id in state.containers]
+
+    def sail_to(self, ship_id, port_id) -> bool:
+        """
+        Sails a ship to a port if it has enough fuel, like Ship.sail_to().
+
+        Args:
+            ship_id (int): The ID of the ship.
+            port_id (int): The ID of the destination port.
+
+        Returns:
+            bool: True if the ship sailed, False if it lacks the fuel.
+        """
+        ship = self.ship(ship_id)
+        origin = self.port(ship.port_id)
+        destination = self.port(port_id)
+        distance = haversine(radians(origin.latitude), radians(origin.longitude),
+                             radians(destination.latitude), radians(destination.longitude))
+        required_fuel = distance * ship.fuel_consumption_per_km
+        if ship.fuel < required_fuel:
+            return False
+        self._ships[ship_id] = ship._replace(fuel=ship.fuel - required_fuel, port_id=port_id)
+        if ship_id in origin.ships:
+            self._ports[origin.port_id] = origin._replace(ships=tuple(s for s in origin.ships if s != ship_id))
+        destination = self.port(port_id)  # The origin may be the destination
+        if ship_id not in destination.ships or ship_id not in destination.history:
+            self._ports[port_id] = destination._replace(
+                ships=destination.ships if ship_id in destination.ships else destination.ships + (ship_id,),
+                history=destination.history if ship_id in destination.history else destination.history + (ship_id,)
+            )
+        return True
+
+    def refuel(self, ship_id, fuel_amount):
+        """
+        Adds fuel to a ship, like Ship.refuel().
+
+        Args:
+            ship_id (int): The ID of the ship.
+            fuel_amount (float): The amount of fuel to add.
+        """
+        ship = self.ship(ship_id)
+        self._ships[ship_id] = ship._replace(fuel=ship.fuel + fuel_amount)
+
+    def load_container(self, ship_id, container_id) -> bool:
+        """
+        Moves a container from the ship's port onto the ship.
+
+        Args:
+            ship_id (int): The ID of the ship.
+            container_id (int): The ID of the container.
+
+        Returns:
+            bool: True if the container was loaded, False if it is not at the ship's port,
+            the ship is full or it already carries the container.
+        """
+        ship = self.ship(ship_id)
+        port = self.port(ship.port_id)
+        if (container_id not in port.containers or len(ship.containers) >= ship.max_containers
+                or container_id in ship.containers):
+            return False
+        self._ships[ship_id] = ship._replace(containers=ship.containers + (container_id,))
+        self._ports[port.port_id] = port._replace(containers=tuple(c for c in port.containers if c != container_id))
+        return True
+
+    def unload_container(self, ship_id, container_id) -> bool:
+        """
+        Moves a container from a ship to the ship's port.
+
+        Args:
+            ship_id (int): The ID of the ship.
+            container_id (int): The ID of the container.
+
+        Returns:
+            bool: True if the container was unloaded, False if the ship does not carry it.
+        """
+        ship = self.ship(ship_id)
+        if container_id not in ship.containers:
+            return False
+        port = self.port(ship.port_id)
+        self._ships[ship_id] = ship._replace(containers=tuple(c for c in ship.containers if c != container_id))
+        self._ports[port.port_id] = port._replace(containers=port.containers + (container_id,))
+        return True